@@ -3,9 +3,25 @@
 __author__ = 'hofmann'
 __version__ = '0.1.1'
 
+import os
 import io
+import gzip
+import shutil
+import tempfile
 import StringIO
+import operator
+import multiprocessing as mp
+from itertools import imap, izip, compress, islice
 from scripts.Archive.compress import Compress
+from scripts.Archive.archive import Archive
+from scripts.Table.column import Column, to_number
+from scripts.Table.lazy import MappedTable, LazyColumn
+from scripts.Table.cache import ColumnarCache
+from scripts.Table.view import ColumnView
+from scripts.Table.join import hash_join, merge_join
+from scripts.Table.groupby import GroupBy
+from scripts.Table.sort import get_key_function, merge_runs
+from scripts.Table.writer import ThreadedWriter
 
 
 class MetadataTable(Compress):
@@ -13,6 +29,13 @@ class MetadataTable(Compress):
 
 	_label = "MetadataTable"
 
+	_read_block_size = 1024 * 1024
+	_write_block_rows = 65536
+	_parallel_chunk_size = 64 * 1024 * 1024
+	# approximate memory of a row list and of each cell string, in addition to the characters
+	_row_memory_overhead = 64
+	_cell_memory_overhead = 48
+
 	def __init__(self, separator="\t", logfile=None, verbose=True):
 		"""
 			Handle tab separated files
@@ -38,11 +61,72 @@ class MetadataTable(Compress):
 		self._meta_table = {}
 		self._separator = separator
 		self._list_of_column_names = []
+		self._column_index = {}
+		self._mapped_table = None
+		self._number_of_rows_written = {}
+		self._warned_single_point_files = set()
 
 	def clear(self):
+		if self._mapped_table is not None:
+			self._mapped_table.close()
+			self._mapped_table = None
 		self._number_of_rows = 0
 		self._meta_table = {}
 		self._list_of_column_names = []
+		self._column_index = {}
+		self._number_of_rows_written = {}
+
+	def build_index(self, column_name):
+		"""
+			Build a hash index of a column for constant time lookups of values
+
+			@attention: The index maps each value to the row index of its first occurrence
+
+			@param column_name: column name
+			@type column_name: int | long | str | unicode
+
+			@return: Nothing
+			@rtype: None
+		"""
+		assert isinstance(column_name, (basestring, int, long))
+		assert self.has_column(column_name), "Column '{}' not found!".format(column_name)
+
+		index = {}
+		for row_index, value in enumerate(self._meta_table[column_name]):
+			if value not in index:
+				index[value] = row_index
+		self._column_index[column_name] = index
+
+	def drop_index(self, column_name=None):
+		"""
+			Remove the hash index of a column
+
+			@attention: All indexes are removed if no column name is given
+
+			@param column_name: column name
+			@type column_name: None | int | long | str | unicode
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if column_name is None:
+			self._column_index = {}
+			return
+		assert isinstance(column_name, (basestring, int, long))
+		self._column_index.pop(column_name, None)
+
+	def has_index(self, column_name):
+		"""
+			Test if a hash index of a column is available
+
+			@param column_name: column name
+			@type column_name: int | long | str | unicode
+
+			@return: True if column is indexed
+			@rtype: bool
+		"""
+		assert isinstance(column_name, (basestring, int, long))
+		return column_name in self._column_index
 
 	def _has_unique_columns(self, list_of_column_names=None):
 		if list_of_column_names is None:
@@ -50,11 +134,12 @@ class MetadataTable(Compress):
 		return len(list_of_column_names) == len(set(list_of_column_names))
 
 	def remove_empty_columns(self):
-		for column_name in self.get_column_names():
+		for column_name in self.get_column_names().copy():
 			column = set(self.get_column(column_name))
 			column = [value.strip() for value in column]
 			if len(column) == 1 and '' in column:
 				self._meta_table.pop(column_name)
+				self.drop_index(column_name)
 				index = self._list_of_column_names.index(column_name)
 				self._list_of_column_names.pop(index)
 
@@ -87,6 +172,33 @@ class MetadataTable(Compress):
 			for row in self.parse_stream(file_handler, separator, column_names, comment_line, as_list):
 				yield row
 
+	def parse_archive(
+		self, file_path, members=None, separator=None, column_names=False, comment_line=None, as_list=True):
+		"""
+			Reading comma or tab separated values from the files of an archive in one sequential pass
+
+			@attention: The rows of a file must be read before the next file is yielded
+
+			@param file_path: path to archive or a stream of an archive
+			@type file_path: str | unicode | file
+			@param members: glob pattern of member names, function testing a tarfile.TarInfo, or None for all files
+			@type members: str | unicode | (tarfile.TarInfo) -> bool | None
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: character or list of character indication comment lines
+			@type comment_line: str | unicode | list[str|unicode]
+			@param as_list: If true lists are returned, else dicts.
+			@param as_list: bool
+
+			@return: Generator of member names and generators of rows
+			@rtype: generator[tuple[str, generator[list|dict]]]
+		"""
+		archive = Archive(logfile=self._logfile, verbose=self._verbose)
+		for tarinfo, file_handler in archive.iter_members(file_path, members):
+			yield tarinfo.name, self.parse_stream(file_handler, separator, column_names, comment_line, as_list)
+
 	def parse_stream(self, stream_input, separator=None, column_names=False, comment_line=None, as_list=True):
 		"""
 			Reading comma or tab separated values from a stream
@@ -159,10 +271,15 @@ class MetadataTable(Compress):
 				list_of_column_names = sorted(dict_row.keys())
 			yield dict_row
 
-	def read(self, file_path, separator=None, column_names=False, comment_line=None):
+	def read(
+		self, file_path, separator=None, column_names=False, comment_line=None, lazy=False, max_processors=1,
+		save_cache=False):
 		"""
 			Reading comma or tab separated values in a file as table
 
+			@attention: lazy reading is only available for uncompressed files.
+			A binary cache of the file is used instead of parsing, if it matches the current state of the file.
+
 			@param file_path: path to file to be opened
 			@type file_path: str | unicode
 			@param separator: default character assumed to separate values in a file
@@ -171,6 +288,12 @@ class MetadataTable(Compress):
 			@type column_names: bool
 			@param comment_line: character or list of character indication comment lines
 			@type comment_line: str | unicode | list[str|unicode]
+			@param lazy: If true, the file is memory-mapped and cells are parsed when accessed
+			@type lazy: bool
+			@param max_processors: Maximum number processors used for parsing an uncompressed file or decompressing a compressed file
+			@type max_processors: int
+			@param save_cache: If true, a binary cache of the parsed file is written
+			@type save_cache: bool
 
 			@return: None
 			@rtype: None
@@ -188,49 +311,496 @@ class MetadataTable(Compress):
 		assert isinstance(separator, basestring)
 		assert isinstance(comment_line, list)
 		assert isinstance(column_names, bool)
+		assert isinstance(lazy, bool)
+		assert self.validate_number(max_processors, minimum=1)
+		assert isinstance(save_cache, bool)
 
 		self.clear()
-		with self.open(file_path) as file_handler:
+		if lazy:
+			self._read_lazy(file_path, separator, column_names, comment_line)
+			return
+		cache = ColumnarCache(self.get_cache_path(file_path))
+		if cache.is_valid(file_path, separator, column_names, comment_line):
+			self._logger.info("Reading cache of file: '{}'".format(file_path))
+			self._list_of_column_names, self._meta_table, self._number_of_rows = cache.load()
+			return
+
+		if max_processors > 1 and self.get_compression_type(file_path) is None:
+			self._read_parallel(file_path, separator, column_names, comment_line, max_processors)
+		else:
+			self._read_serial(file_path, separator, column_names, comment_line, max_processors)
+
+		if save_cache:
+			self.save_cache(file_path, separator, column_names, comment_line)
+
+	def _read_serial(self, file_path, separator, column_names, comment_line, max_processors=1):
+		"""
+			Reading comma or tab separated values in a file as table
+
+			@param file_path: path to file to be opened
+			@type file_path: str | unicode
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: list of character indication comment lines
+			@type comment_line: list[str|unicode]
+			@param max_processors: Maximum number processors used for decompressing a compressed file
+			@type max_processors: int
+
+			@return: None
+			@rtype: None
+		"""
+		with self.open(file_path, max_processors=max_processors) as file_handler:
 			self._logger.info("Reading file: '{}'".format(file_path))
 
 			# read column names
 			if column_names:
 				self._list_of_column_names = self._parse_column_names(file_handler, separator)
 				for column_name in self._list_of_column_names:
-					self._meta_table[column_name] = []
+					self._meta_table[column_name] = Column()
 
-			# read rows
-			row_count = 0
-			for line in file_handler:
-				row_count += 1
-				row = line.rstrip('\n').rstrip('\r')
-				if line[0] in comment_line or len(row) == 0:
-					continue
-				self._number_of_rows += 1
-				row_cells = row.split(separator)
-				number_of_columns = len(self.get_column_names())
-				if number_of_columns != 0 and number_of_columns != len(row_cells):
-					msg = "Format error. Bad number of values in line {}".format(row_count)
+			# read rows in blocks, filling columns in bulk
+			comment_characters = set(comment_line)
+			line_count = 0
+			for lines in self._read_line_blocks(file_handler):
+				self._add_lines(lines, line_count, separator, comment_characters)
+				line_count += len(lines)
+
+	def _add_lines(self, lines, line_offset, separator, comment_characters):
+		"""
+			Add a block of lines as rows, filling columns in bulk
+
+			@attention: Columns are created from the first row, if there are none
+
+			@param lines: lines without line endings
+			@type lines: list[str|unicode]
+			@param line_offset: number of lines before the block, used in error messages
+			@type line_offset: int
+			@param separator: character separating values in a row
+			@type separator: str | unicode
+			@param comment_characters: characters indicating comment lines
+			@type comment_characters: set[str|unicode]
+
+			@return: None
+			@rtype: None
+
+			@raises: ValueError
+		"""
+		rows = [line for line in lines if line and line[0] not in comment_characters]
+		if len(rows) == 0:
+			return
+		number_of_columns = len(self._list_of_column_names)
+		if number_of_columns == 0:
+			number_of_columns = rows[0].count(separator) + 1
+			self._list_of_column_names = range(number_of_columns)
+			for column_name in self._list_of_column_names:
+				self._meta_table[column_name] = Column()
+		if set([row.count(separator) for row in rows]) != {number_of_columns - 1}:
+			for index, line in enumerate(lines):
+				if line and line[0] not in comment_characters and line.count(separator) != number_of_columns - 1:
+					msg = "Format error. Bad number of values in line {}".format(line_offset + index + 1)
+					self._logger.error(msg)
+					raise ValueError(msg)
+		self._number_of_rows += len(rows)
+		cells = separator.join(rows).split(separator)
+		for index, column_name in enumerate(self._list_of_column_names):
+			self._meta_table[column_name].extend(cells[index::number_of_columns])
+
+	@staticmethod
+	def get_cache_path(file_path):
+		"""
+			Get path of the binary columnar cache of a file
+
+			@param file_path: path to file
+			@type file_path: str | unicode
+
+			@return: path to cache file
+			@rtype: str | unicode
+		"""
+		return file_path + ".mdtc"
+
+	def save_cache(self, file_path, separator=None, column_names=False, comment_line=None):
+		"""
+			Write the loaded table to a binary columnar cache next to the file it was read from
+
+			@attention: read() uses the cache as long as the file is unchanged, so save the table unmodified
+
+			@param file_path: path to file the table was read from
+			@type file_path: str | unicode
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: character or list of character indication comment lines
+			@type comment_line: str | unicode | list[str|unicode]
+
+			@return: True if cache was written
+			@rtype: bool
+		"""
+		if comment_line is None:
+			comment_line = ['#']
+		elif isinstance(comment_line, basestring):
+			comment_line = [comment_line]
+
+		if separator is None:
+			separator = self._separator
+
+		assert isinstance(file_path, basestring)
+		assert self.validate_file(file_path)
+
+		cache_path = self.get_cache_path(file_path)
+		try:
+			ColumnarCache(cache_path).save(
+				self._list_of_column_names, self._meta_table, self._number_of_rows,
+				file_path, separator, column_names, comment_line)
+		except (TypeError, ValueError, IOError) as e:
+			# column names, which are not utf-8 encoded, can not be written to the header
+			self._logger.warning("Could not write cache '{}': {}".format(cache_path, e))
+			if os.path.exists(cache_path):
+				os.remove(cache_path)
+			return False
+		return True
+
+	def _read_parallel(self, file_path, separator, column_names, comment_line, max_processors):
+		"""
+			Parse chunks of an uncompressed file in parallel
+
+			@attention: Chunks are split at line breaks, merged in order of the file
+
+			@param file_path: path to file to be opened
+			@type file_path: str | unicode
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: list of character indication comment lines
+			@type comment_line: list[str|unicode]
+			@param max_processors: Maximum number processors used for parsing
+			@type max_processors: int
+
+			@return: None
+			@rtype: None
+		"""
+		self._logger.info("Reading file: '{}'".format(file_path))
+		comment_characters = set(comment_line)
+		with open(file_path, 'rb') as file_handler:
+			if column_names:
+				self._list_of_column_names = self._parse_column_names(file_handler, separator)
+			data_start = file_handler.tell()
+			if not column_names:
+				for line in file_handler:
+					row = line.rstrip('\n').rstrip('\r')
+					if line[0] in comment_characters or len(row) == 0:
+						continue
+					self._list_of_column_names = range(row.count(separator) + 1)
+					break
+		for column_name in self._list_of_column_names:
+			self._meta_table[column_name] = Column()
+		number_of_columns = len(self._list_of_column_names)
+		if number_of_columns == 0:
+			return
+
+		list_of_offsets = self._get_chunk_offsets(file_path, data_start)
+		list_of_args = [
+			(file_path, list_of_offsets[index], list_of_offsets[index + 1], separator, comment_line, number_of_columns)
+			for index in range(len(list_of_offsets) - 1)]
+		line_count = 0
+		pool = mp.Pool(processes=max_processors)
+		try:
+			# chunks are merged as they arrive, in order of the file
+			for number_of_lines, number_of_rows, list_of_buffers, bad_line in pool.imap(_parse_chunk_task, list_of_args):
+				if bad_line is not None:
+					msg = "Format error. Bad number of values in line {}".format(line_count + bad_line)
 					self._logger.error(msg)
 					raise ValueError(msg)
-				for index, value in enumerate(row_cells):
-					if column_names:
-						column_name = self._list_of_column_names[index]
+				line_count += number_of_lines
+				for column_name, (column_type, data, values_pool) in zip(self._list_of_column_names, list_of_buffers):
+					if column_type == Column._type_object:
+						self._meta_table[column_name].extend(data.split('\n'))
 					else:
-						column_name = index
-						if column_name not in self._meta_table:
-							self._meta_table[column_name] = []
-					self._meta_table[column_name].append(row_cells[index].rstrip('\n').rstrip('\r'))
-				if number_of_columns == 0:
-					self._list_of_column_names = sorted(self._meta_table.keys())
+						self._meta_table[column_name].extend_buffers(column_type, data, values_pool)
+				self._number_of_rows += number_of_rows
+		finally:
+			pool.terminate()
+
+	def _get_chunk_offsets(self, file_path, start, chunk_size=None):
+		"""
+			Get offsets splitting a file into chunks at line breaks
+
+			@param file_path: path to file
+			@type file_path: str | unicode
+			@param start: offset of first chunk
+			@type start: int | long
+			@param chunk_size: approximate number of bytes of a chunk
+			@type chunk_size: int | long
+
+			@return: Offsets, including start and end of file
+			@rtype: list[int|long]
+		"""
+		if chunk_size is None:
+			chunk_size = self._parallel_chunk_size
+		list_of_offsets = [start]
+		with open(file_path, 'rb') as file_handler:
+			file_handler.seek(0, 2)
+			size = file_handler.tell()
+			while list_of_offsets[-1] + chunk_size < size:
+				file_handler.seek(list_of_offsets[-1] + chunk_size)
+				file_handler.readline()
+				if file_handler.tell() >= size:
+					break
+				list_of_offsets.append(file_handler.tell())
+		list_of_offsets.append(size)
+		return list_of_offsets
+
+	def read_rows(self, file_path, first_row, number_of_rows, separator=None, column_names=False, comment_line=None):
+		"""
+			Read a range of rows of a file as table
+
+			@attention: Rows are counted as lines after the column names, comment lines are counted but skipped.
+			Decompression of gzip files starts at the nearest access point of their index.
+			A gzip file of a single member has one access point only, and is decompressed from the start.
+
+			@param file_path: path to file to be opened
+			@type file_path: str | unicode
+			@param first_row: index of the first row
+			@type first_row: int | long
+			@param number_of_rows: maximum number of rows
+			@type number_of_rows: int | long
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: character or list of character indication comment lines
+			@type comment_line: str | unicode | list[str|unicode]
+
+			@return: None
+			@rtype: None
+		"""
+		if comment_line is None:
+			comment_line = ['#']
+		elif isinstance(comment_line, basestring):
+			comment_line = [comment_line]
+
+		if separator is None:
+			separator = self._separator
+
+		assert isinstance(file_path, basestring)
+		assert self.validate_file(file_path)
+		assert self.validate_number(first_row, minimum=0)
+		assert self.validate_number(number_of_rows, minimum=0)
+		assert isinstance(separator, basestring)
+		assert isinstance(comment_line, list)
+		assert isinstance(column_names, bool)
+
+		self.clear()
+		if self.get_compression_type(file_path) == "gz":
+			full_path = self.get_full_path(file_path)
+			index = self.get_gzip_index(file_path)
+			if len(index.list_of_points) == 1 and full_path not in self._warned_single_point_files:
+				self._warned_single_point_files.add(full_path)
+				self._logger.warning(
+					"'{}' has a single access point, rows are read from its start. "
+					"Compress it with max_processors > 1 for one access point per block.".format(file_path))
+		if column_names:
+			self._list_of_column_names = self._read_column_names(file_path, separator)
+			for column_name in self._list_of_column_names:
+				self._meta_table[column_name] = Column()
+		first_line = first_row + 1 if column_names else first_row
+		lines = list(islice(self._iter_lines_from(file_path, first_line), number_of_rows))
+		# lines are numbered after the column names in error messages, like read() does
+		self._add_lines(lines, first_row, separator, set(comment_line))
+
+	def read_rows_of_key(
+		self, file_path, key_column_name, value, separator=None, column_names=False, comment_line=None, numeric=False):
+		"""
+			Read the rows of a file sorted by a key column, that have a key value
+
+			@attention: The file must be sorted in ascending order of the key column, like written after sort_by.
+			Access points of the index of gzip files are searched binary, other files are read from the start.
+
+			@param file_path: path to file to be opened
+			@type file_path: str | unicode
+			@param key_column_name: name or index of the key column
+			@type key_column_name: int | long | str | unicode
+			@param value: key value
+			@type value: str | unicode | int | long | float
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: character or list of character indication comment lines
+			@type comment_line: str | unicode | list[str|unicode]
+			@param numeric: If true, keys are compared as numbers
+			@type numeric: bool
+
+			@return: None
+			@rtype: None
+		"""
+		if comment_line is None:
+			comment_line = ['#']
+		elif isinstance(comment_line, basestring):
+			comment_line = [comment_line]
+
+		if separator is None:
+			separator = self._separator
+
+		assert isinstance(file_path, basestring)
+		assert self.validate_file(file_path)
+		assert isinstance(separator, basestring)
+		assert isinstance(comment_line, list)
+		assert isinstance(column_names, bool)
+		assert isinstance(numeric, bool)
+
+		self.clear()
+		first_line = 0
+		if column_names:
+			self._list_of_column_names = self._read_column_names(file_path, separator)
+			for column_name in self._list_of_column_names:
+				self._meta_table[column_name] = Column()
+			position = self._get_column_positions(self._list_of_column_names, [key_column_name])[0]
+			first_line = 1
+		else:
+			assert isinstance(key_column_name, (int, long)), "Columns are indexed by number without column names"
+			position = key_column_name
+		get_key = get_key_function([position], numeric)
+		key = to_number(value) if numeric else value
+		comment_characters = set(comment_line)
+
+		def iter_rows(lines):
+			for line in lines:
+				line = line.rstrip('\n').rstrip('\r')
+				if line and line[0] not in comment_characters:
+					yield line
+
+		start_line = first_line
+		if self.get_compression_type(file_path) == "gz":
+			index = self.get_gzip_index(file_path)
+			list_of_points = [point for point in index.list_of_points if point[2] >= first_line]
+			# find the last access point with a first row of lower key
+			lower = 0
+			upper = len(list_of_points)
+			while lower < upper:
+				middle = (lower + upper) // 2
+				lines = index.iter_lines(file_path, list_of_points[middle])
+				row = next(iter_rows(lines), None)
+				lines.close()
+				if row is None or get_key(row.split(separator)) >= key:
+					upper = middle
+				else:
+					lower = middle + 1
+			if lower > 0:
+				start_line = list_of_points[lower - 1][2]
+
+		rows = []
+		lines = self._iter_lines_from(file_path, start_line)
+		for row in iter_rows(lines):
+			row_key = get_key(row.split(separator))
+			if row_key < key:
+				continue
+			if row_key > key:
+				break
+			rows.append(row)
+		lines.close()
+		self._add_lines(rows, start_line, separator, comment_characters)
+
+	def _iter_lines_from(self, file_path, line_number):
+		"""
+			Read the lines of a file starting at a line
+
+			@attention: Decompression of gzip files starts at the nearest access point of their index
+
+			@param file_path: path to file
+			@type file_path: str | unicode
+			@param line_number: number of the first line, starting at 0
+			@type line_number: int | long
+
+			@return: Generator of lines without line endings
+			@rtype: generator[str|unicode]
+		"""
+		if self.get_compression_type(file_path) == "gz":
+			index = self.get_gzip_index(file_path)
+			point = index.get_point_of_line(line_number)
+			lines = index.iter_lines(file_path, point)
+			try:
+				for line in islice(lines, line_number - point[2], None):
+					yield line.rstrip('\n').rstrip('\r')
+			finally:
+				lines.close()
+			return
+		with self.open(file_path) as file_handler:
+			for line in islice(file_handler, line_number, None):
+				yield line.rstrip('\n').rstrip('\r')
+
+	def _read_lazy(self, file_path, separator, column_names, comment_line):
+		"""
+			Memory-map an uncompressed file as table, cells are parsed when accessed
+
+			@param file_path: path to file to be opened
+			@type file_path: str | unicode
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: list of character indication comment lines
+			@type comment_line: list[str|unicode]
+
+			@return: None
+			@rtype: None
+		"""
+		if self.get_compression_type(file_path) is not None:
+			msg = "Lazy reading of compressed files is not supported: '{}'".format(file_path)
+			self._logger.error(msg)
+			raise IOError(msg)
+
+		self._logger.info("Mapping file: '{}'".format(file_path))
+		self._mapped_table = MappedTable(file_path, separator, column_names, comment_line)
+		self._list_of_column_names = list(self._mapped_table.list_of_column_names)
+		assert self._has_unique_columns(), "Column names must be unique!"
+		for index, column_name in enumerate(self._list_of_column_names):
+			self._meta_table[column_name] = LazyColumn(self._mapped_table, index)
+		self._number_of_rows = len(self._mapped_table.offsets)
+
+	def _read_line_blocks(self, stream_input, block_size=None):
+		"""
+			Read lines of a stream in large blocks
+
+			@attention: Line endings are removed
+
+			@param stream_input: stream
+			@type stream_input: file | io.FileIO | StringIO.StringIO
+			@param block_size: approximate number of bytes read at once
+			@type block_size: int | long
+
+			@return: Generator of lists of lines
+			@rtype: generator[list[str|unicode]]
+		"""
+		if block_size is None:
+			block_size = self._read_block_size
+		remainder = ''
+		while True:
+			data = stream_input.read(block_size)
+			if not data:
+				break
+			data = remainder + data
+			lines = data.split('\n')
+			remainder = lines.pop()
+			if '\r' in data:
+				lines = [line.rstrip('\r') for line in lines]
+			yield lines
+		if remainder:
+			yield [remainder.rstrip('\r')]
 
 	def write(
 		self, file_path, separator=None, column_names=False, compression_level=0,
-		exclude=None, value_list=None, key_column_name=None):
+		exclude=None, value_list=None, key_column_name=None, append=False, buffer_size=1024 * 1024, threaded=False,
+		max_processors=1):
 		"""
 			Write tab separated files
 
-			@attention: No comments will be written
+			@attention: No comments will be written.
+			When appending, only rows added since the last write of this table to the file are written,
+			all rows if the file was not written by this table or changed since.
 
 			@param file_path: path to file to be opened
 			@type file_path: str | unicode
@@ -243,12 +813,22 @@ class MetadataTable(Compress):
 			@param exclude: If True, rows with a value in the value_list at the key_column_names are removed, False: all others are removed
 			@type exclude: None | bool
 			@param value_list:
-			@type value_list: list[str|unicode]
+			@type value_list: list[str|unicode] | set[str|unicode] | ColumnView
 			@param key_column_name: column name of excluded or included rows
-			@type key_column_name: str | unicode
+			@type key_column_name: int | long | str | unicode
+			@param append: If True, new rows are appended to an existing file with the same column names
+			@type append: bool
+			@param buffer_size: number of bytes buffered before writing to an uncompressed file
+			@type buffer_size: int
+			@param threaded: If True, rows are written by a separate thread, so formatting and compression overlap
+			@type threaded: bool
+			@param max_processors: Number of threads compressing blocks of a gz file
+			@type max_processors: int
 
 			@return: None
 			@rtype: None
+
+			@raises: ValueError
 		"""
 
 		if separator is None:
@@ -261,43 +841,359 @@ class MetadataTable(Compress):
 		assert isinstance(compression_level, (int, long))
 		assert 0 <= compression_level < 10
 		assert exclude is None or isinstance(exclude, bool)
-		assert value_list is None or isinstance(value_list, list)
-		assert key_column_name is None or isinstance(key_column_name, basestring), "Invalid: {}".format(key_column_name)
+		assert value_list is None or isinstance(value_list, (list, set, frozenset, ColumnView))
+		assert key_column_name is None or isinstance(key_column_name, (basestring, int, long)), "Invalid: {}".format(key_column_name)
+		assert isinstance(append, bool)
+		assert self.validate_number(buffer_size, minimum=1)
+		assert isinstance(threaded, bool)
+		assert self.validate_number(max_processors, minimum=1)
+
+		full_path = self.get_full_path(file_path)
+		mode = "w"
+		first_row_number = 0
+		if append and os.path.isfile(full_path) and os.path.getsize(full_path) > 0:
+			mode = "a"
+			first_row_number = self._get_number_of_rows_written(full_path, separator, column_names)
 
 		if compression_level > 0:
-			file_handler = self.open(file_path, "w", compression_level)
+			file_handler = self.open(file_path, mode, compression_level, max_processors=max_processors)
+		else:
+			file_handler = open(file_path, mode, buffer_size)
+		if threaded:
+			file_handler = ThreadedWriter(file_handler)
+
+		if column_names and mode == "w":
+			file_handler.write(separator.join(self._get_header()) + '\n')
+		if exclude is not None:
+			list_of_row_numbers = self._get_row_indexes(key_column_name, value_list, exclude)
+			if first_row_number > 0:
+				list_of_row_numbers = [row_number for row_number in list_of_row_numbers if row_number >= first_row_number]
 		else:
-			file_handler = open(file_path, "w")
+			list_of_row_numbers = xrange(first_row_number, self._number_of_rows)
+		try:
+			self._write_rows(file_handler, list_of_row_numbers, separator)
+		finally:
+			file_handler.close()
+		self._number_of_rows_written[full_path] = (self._number_of_rows, os.path.getsize(full_path))
+
+	def _write_rows(self, file_handler, list_of_row_numbers, separator):
+		"""
+			Write rows in blocks, converting the cells of a block column by column
 
-		if column_names:
-			if not isinstance(self._list_of_column_names[0], basestring):
-				header = separator.join([str(index) for index in self._list_of_column_names])
+			@param file_handler: file handler rows are written to
+			@type file_handler: file | gzip.GzipFile | ThreadedWriter
+			@param list_of_row_numbers: row indexes, ascending
+			@type list_of_row_numbers: xrange | list[int]
+			@param separator: character separating values in a row
+			@type separator: str | unicode
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if len(self._list_of_column_names) == 0:
+			return
+		list_of_columns = [self._meta_table[column_name] for column_name in self._list_of_column_names]
+		list_of_has_strings = [column.has_strings() for column in list_of_columns]
+		is_range = isinstance(list_of_row_numbers, xrange)
+		for block_start in xrange(0, len(list_of_row_numbers), self._write_block_rows):
+			block_end = min(block_start + self._write_block_rows, len(list_of_row_numbers))
+			block = []
+			if is_range:
+				first_row = list_of_row_numbers[block_start]
+				last_row = list_of_row_numbers[block_end - 1]
+				for column, has_strings in izip(list_of_columns, list_of_has_strings):
+					values = column[first_row:last_row + 1]
+					block.append(values if has_strings else map(str, values))
 			else:
-				header = separator.join(self._list_of_column_names)
-			file_handler.write(header + '\n')
-		for row_number in range(0, self._number_of_rows):
-			if exclude is not None:
-				if not exclude and self._meta_table[key_column_name][row_number] not in value_list:
-					continue
-				if exclude and self._meta_table[key_column_name][row_number] in value_list:
+				row_numbers = list_of_row_numbers[block_start:block_end]
+				for column, has_strings in izip(list_of_columns, list_of_has_strings):
+					values = imap(column.__getitem__, row_numbers)
+					block.append(values if has_strings else imap(str, values))
+			file_handler.write('\n'.join(imap(separator.join, izip(*block))) + '\n')
+
+	def _get_header(self):
+		"""
+			Get column names as written to a file
+
+			@return: column names
+			@rtype: list[str|unicode]
+		"""
+		return [
+			column_name if isinstance(column_name, basestring) else str(column_name)
+			for column_name in self._list_of_column_names]
+
+	def _get_number_of_rows_written(self, file_path, separator, column_names):
+		"""
+			Get the number of rows of the table already written to an existing file
+
+			@attention: If the file was not written by this table or changed since, no rows were written
+
+			@param file_path: full path to file
+			@type file_path: str | unicode
+			@param separator: character separating values in a row
+			@type separator: str | unicode
+			@param column_names: True if column names are written
+			@type column_names: bool
+
+			@return: Number of rows
+			@rtype: int
+
+			@raises: ValueError
+		"""
+		if column_names:
+			if self._read_column_names(file_path, separator) != self._get_header():
+				msg = "Column names of '{}' do not match the table!".format(file_path)
+				self._logger.error(msg)
+				raise ValueError(msg)
+		else:
+			with self.open(file_path) as file_handler:
+				number_of_columns = len(file_handler.readline().split(separator))
+			if number_of_columns != len(self._list_of_column_names):
+				msg = "File '{}' has {} columns, the table {}!".format(
+					file_path, number_of_columns, len(self._list_of_column_names))
+				self._logger.error(msg)
+				raise ValueError(msg)
+
+		number_of_rows, file_size = self._number_of_rows_written.get(file_path, (0, None))
+		if file_size != os.path.getsize(file_path):
+			self._logger.warning("'{}' was not written by this table, all rows are appended".format(file_path))
+			return 0
+		if number_of_rows > self._number_of_rows:
+			msg = "File '{}' has more rows than the table!".format(file_path)
+			self._logger.error(msg)
+			raise ValueError(msg)
+		return number_of_rows
+
+	def filter_file(
+		self, src, dst, key_column_name, value_list, exclude=True, separator=None, column_names=False,
+		comment_line=None, compression_level=0):
+		"""
+			Stream rows of a file to a new file, keeping or removing rows by values of a key column
+
+			@attention: No comments will be written, the file is never loaded as table. Like parse_file, it clears the table.
+
+			@param src: path to file to be read
+			@type src: str | unicode
+			@param dst: path to file to be written
+			@type dst: str | unicode
+			@param key_column_name: column name or index of excluded or included rows
+			@type key_column_name: int | long | str | unicode
+			@param value_list: values of the key column
+			@type value_list: list[str|unicode] | set[str|unicode] | ColumnView
+			@param exclude: If True, rows with a value in the value_list at the key_column_name are removed, False: all others are removed
+			@type exclude: bool
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: character or list of character indication comment lines
+			@type comment_line: str | unicode | list[str|unicode]
+			@param compression_level: any value above 0 will compress files
+			@type compression_level: int | long
+
+			@return: Number of rows written
+			@rtype: int
+		"""
+		if separator is None:
+			separator = self._separator
+
+		assert isinstance(src, basestring)
+		assert self.validate_file(src)
+		assert isinstance(dst, basestring)
+		assert self.validate_dir(dst, only_parent=True)
+		assert isinstance(key_column_name, (basestring, int, long))
+		assert isinstance(value_list, (list, set, frozenset, ColumnView))
+		assert isinstance(exclude, bool)
+		assert isinstance(compression_level, (int, long))
+		assert 0 <= compression_level < 10
+
+		key_index = key_column_name
+		if column_names:
+			list_of_column_names = self._read_column_names(src, separator)
+			key_index = self._get_column_positions(list_of_column_names, [key_column_name])[0]
+
+		value_set = frozenset(value_list)
+		if compression_level > 0:
+			file_handler = self.open(dst, "w", compression_level)
+		else:
+			file_handler = open(dst, "w")
+
+		self._logger.info("Filtering file: '{}'".format(src))
+		number_of_rows = 0
+		with file_handler:
+			if column_names:
+				file_handler.write(separator.join(list_of_column_names) + '\n')
+			for row in self.parse_file(src, separator, column_names, comment_line, as_list=True):
+				if (row[key_index] in value_set) == exclude:
 					continue
+				file_handler.write(separator.join(row) + '\n')
+				number_of_rows += 1
+		return number_of_rows
+
+	def _read_column_names(self, file_path, separator):
+		"""
+			Read the column names of a file
+
+			@param file_path: path to file
+			@type file_path: str | unicode
+			@param separator: character separating values in a row
+			@type separator: str | unicode
+
+			@return: column names
+			@rtype: list[str|unicode]
+		"""
+		with self.open(file_path) as file_handler:
+			return self._parse_column_names(file_handler, separator)
+
+	def _get_column_positions(self, list_of_column_names, list_of_requested_names):
+		"""
+			Get the positions of columns in a row
+
+			@param list_of_column_names: column names of a file
+			@type list_of_column_names: list[str|unicode]
+			@param list_of_requested_names: names of columns
+			@type list_of_requested_names: list[str|unicode]
+
+			@return: positions of columns
+			@rtype: list[int]
+
+			@raises: ValueError
+		"""
+		for column_name in list_of_requested_names:
+			if column_name not in list_of_column_names:
+				msg = "Column '{}' not found!".format(column_name)
+				self._logger.error(msg)
+				raise ValueError(msg)
+		return [list_of_column_names.index(column_name) for column_name in list_of_requested_names]
+
+	def group_by(self, key_column_names):
+		"""
+			Group rows of the table by the values of key columns
+
+			@attention: Use agg() of the returned object to aggregate, e.g. group_by("taxid").agg([("length", "sum")])
+
+			@param key_column_names: name of key column or list of names
+			@type key_column_names: int | long | str | unicode | list[int|long|str|unicode] | ColumnView
+
+			@return: Grouping of rows
+			@rtype: GroupBy
+		"""
+		if isinstance(key_column_names, ColumnView):
+			key_column_names = key_column_names.copy()
+		elif not isinstance(key_column_names, list):
+			key_column_names = [key_column_names]
+		assert self.validate_column_names(key_column_names), "Key columns not found: {}".format(key_column_names)
+		meta_table = self._meta_table
+		return GroupBy(
+			key_column_names, lambda: iter([meta_table]), self._new_table_from_columns, self.validate_column_names,
+			self._logger)
+
+	def group_by_file(
+		self, file_path, key_column_names, separator=None, column_names=False, comment_line=None, block_size=100000):
+		"""
+			Group rows of a file by the values of key columns, streaming the file
+
+			@attention: Only the groups are kept in memory. Like parse_file, it clears the table.
+
+			@param file_path: path to file
+			@type file_path: str | unicode
+			@param key_column_names: name or index of key column or list of them
+			@type key_column_names: int | long | str | unicode | list[int|long|str|unicode] | ColumnView
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: character or list of character indication comment lines
+			@type comment_line: str | unicode | list[str|unicode]
+			@param block_size: number of rows aggregated at once
+			@type block_size: int
+
+			@return: Grouping of rows
+			@rtype: GroupBy
+		"""
+		if separator is None:
+			separator = self._separator
+		if isinstance(key_column_names, ColumnView):
+			key_column_names = key_column_names.copy()
+		elif not isinstance(key_column_names, list):
+			key_column_names = [key_column_names]
+
+		assert isinstance(file_path, basestring)
+		assert self.validate_file(file_path)
+		assert self.validate_number(block_size, minimum=1)
+
+		list_of_column_names = None
+		if column_names:
+			list_of_column_names = self._read_column_names(file_path, separator)
+			self._get_column_positions(list_of_column_names, key_column_names)
+
+		def get_blocks():
+			rows = []
+			for row in self.parse_file(file_path, separator, column_names, comment_line, as_list=True):
+				rows.append(row)
+				if len(rows) >= block_size:
+					yield self._get_block(rows, list_of_column_names)
+					rows = []
+			if len(rows) > 0:
+				yield self._get_block(rows, list_of_column_names)
+
+		def validate_column_names(list_of_requested_names):
+			if list_of_column_names is not None:
+				return all(column_name in list_of_column_names for column_name in list_of_requested_names)
+			first_row = next(self.parse_file(file_path, separator, column_names, comment_line, as_list=True), [])
+			return all(
+				isinstance(column_name, (int, long)) and 0 <= column_name < len(first_row)
+				for column_name in list_of_requested_names)
+
+		return GroupBy(key_column_names, get_blocks, self._new_table_from_columns, validate_column_names, self._logger)
+
+	@staticmethod
+	def _get_block(rows, list_of_column_names=None):
+		"""
+			Transpose rows to columns
+
+			@param rows: cell values of rows
+			@type rows: list[list[str|unicode]]
+			@param list_of_column_names: column names, None for indexes
+			@type list_of_column_names: list[str|unicode] | None
+
+			@return: cell values by column name
+			@rtype: dict[int|str|unicode, tuple[str|unicode]]
+		"""
+		if list_of_column_names is None:
+			list_of_column_names = range(len(rows[0]))
+		return dict(zip(list_of_column_names, zip(*rows)))
+
+	def _new_table_from_columns(self, list_of_column_names, list_of_columns):
+		"""
+			Create a table with the same settings from columns
 
-			row = []
-			for column_names in self._list_of_column_names:
-				row.append(str(self._meta_table[column_names][row_number]))
-			file_handler.write(separator.join(row) + '\n')
-		file_handler.close()
+			@param list_of_column_names: column names or indexes
+			@type list_of_column_names: list[int|long|str|unicode]
+			@param list_of_columns: cell values of each column
+			@type list_of_columns: list[list[str|unicode]]
+
+			@return: New table
+			@rtype: MetadataTable
+		"""
+		assert len(list_of_column_names) == len(list_of_columns)
+		meta_table = MetadataTable(separator=self._separator, logfile=self._logfile, verbose=self._verbose)
+		if len(list_of_columns) > 0:
+			meta_table._number_of_rows = len(list_of_columns[0])
+		for column_name, values in zip(list_of_column_names, list_of_columns):
+			meta_table.insert_column(values, column_name)
+		return meta_table
 
 	def get_column_names(self):
 		"""
 			Get list of column names
 
-			@attention: returns list of indexes if no column names available
+			@attention: returns indexes if no column names available. Use copy() of the view for a modifiable list.
 
-			@return: List of column names or indexes
-			@rtype: list[str|int]
+			@return: Read-only view of column names or indexes
+			@rtype: ColumnView
 		"""
-		return list(self._list_of_column_names)
+		return ColumnView(self._list_of_column_names)
 
 	def get_number_of_rows(self):
 		"""
@@ -321,7 +1217,7 @@ class MetadataTable(Compress):
 		"""
 		return len(self.get_column_names())
 
-	def get_row_index_of_value(self, value, column_name):
+	def get_row_index_of_value(self, value, column_name, use_index=True):
 		"""
 			Get index of value in a column
 
@@ -331,6 +1227,8 @@ class MetadataTable(Compress):
 			@type value: str | unicode
 			@param column_name: column name
 			@type column_name: int | long | str | unicode
+			@param use_index: If true, a hash index of the column is built on demand and used for the lookup
+			@type use_index: bool
 
 			@return: index of value in a column, None if not there
 			@rtype: None | int
@@ -338,6 +1236,11 @@ class MetadataTable(Compress):
 		assert isinstance(column_name, (basestring, int, long))
 		assert self.has_column(column_name), "Column '{}' not found!".format(column_name)
 
+		if use_index:
+			if column_name not in self._column_index:
+				self.build_index(column_name)
+			return self._column_index[column_name].get(value)
+
 		if value in self._meta_table[column_name]:
 			return self._meta_table[column_name].index(value)
 		else:
@@ -366,18 +1269,18 @@ class MetadataTable(Compress):
 		"""
 			Get a column
 
-			@attention: use index if no name available
+			@attention: use index if no name available. Use copy() of the view for a modifiable list.
 
 			@param column_name: column name
 			@type column_name: int | long | str | unicode
 
-			@return: Cell values of a column
-			@rtype: list[str|unicode]
+			@return: Read-only view of the cell values of a column
+			@rtype: ColumnView
 		"""
 		assert isinstance(column_name, (basestring, int, long))
 
 		if column_name in self._meta_table:
-			return list(self._meta_table[column_name])
+			return ColumnView(self._meta_table[column_name])
 		else:
 			return None
 
@@ -423,10 +1326,10 @@ class MetadataTable(Compress):
 		"""
 			Insert a new column or overwrite an old one.
 
-			@attention: if column_name exists, it will be overwritten
+			@attention: if column_name exists, it will be overwritten and its index dropped
 
 			@param list_of_values: Cell values of table column
-			@type list_of_values: list[str|unicode]
+			@type list_of_values: list[str|unicode] | ColumnView
 			@param column_name: column name or index
 			@type column_name: int | long | str | unicode
 
@@ -440,13 +1343,14 @@ class MetadataTable(Compress):
 
 		if list_of_values is None:
 			list_of_values = self.get_empty_column()
-		assert isinstance(list_of_values, list)
+		assert isinstance(list_of_values, (list, ColumnView))
 		assert len(list_of_values) == self._number_of_rows, "Bad amount of values: {}/{}".format(
 			len(list_of_values), self._number_of_rows)
 
 		if column_name not in self._list_of_column_names:
 			self._list_of_column_names.append(column_name)
-		self._meta_table[column_name] = list_of_values
+		self._meta_table[column_name] = Column(list_of_values)
+		self.drop_index(column_name)
 
 	def insert_row(self, row):
 		"""
@@ -474,6 +1378,10 @@ class MetadataTable(Compress):
 			# assert len(row) == len(self._header)
 			for index_column in range(len(row)):
 				self._meta_table[self._list_of_column_names[index_column]].append(row[index_column])
+		for column_name, index in self._column_index.iteritems():
+			value = self._meta_table[column_name][self._number_of_rows]
+			if value not in index:
+				index[value] = self._number_of_rows
 		self._number_of_rows += 1
 
 	def get_cell_value(self, key_column_name, key_value, value_column_name):
@@ -509,12 +1417,12 @@ class MetadataTable(Compress):
 			@attention:
 
 			@param list_of_column_names: column name
-			@type list_of_column_names: list[str|unicode]
+			@type list_of_column_names: list[str|unicode] | ColumnView
 
 			@return: True if all column names exist
 			@rtype: bool
 		"""
-		assert isinstance(list_of_column_names, list)
+		assert isinstance(list_of_column_names, (list, ColumnView))
 
 		list_of_invalid_column_names = []
 		for column_name in list_of_column_names:
@@ -542,6 +1450,8 @@ class MetadataTable(Compress):
 		assert isinstance(meta_table, MetadataTable)
 		assert isinstance(strict, bool)
 
+		row_offset = self._number_of_rows
+
 		if len(self._list_of_column_names) == 0:
 			strict = False
 		if strict:
@@ -565,6 +1475,135 @@ class MetadataTable(Compress):
 			if len(self._meta_table[column_name]) < self._number_of_rows:
 				self._meta_table[column_name].extend([''] * (self._number_of_rows - len(self._meta_table[column_name])))
 
+		self._update_index(row_offset)
+
+	def _update_index(self, row_offset=0):
+		"""
+			Add rows appended since a row offset to the hash indexes
+
+			@param row_offset: first row not yet in the indexes
+			@type row_offset: int | long
+
+			@return: Nothing
+			@rtype: None
+		"""
+		for column_name, index in self._column_index.iteritems():
+			column = self._meta_table[column_name]
+			for row_index in xrange(row_offset, self._number_of_rows):
+				value = column[row_index]
+				if value not in index:
+					index[value] = row_index
+
+	def join(self, meta_table, on, how="inner", sorted_keys=False, suffix="_right"):
+		"""
+			Join with another metadata table by the values of key columns
+
+			@attention: With sorted_keys, both tables must be sorted ascending by their keys and no hash table is built.
+			Otherwise the keys of the smaller table are hashed.
+
+			@param meta_table: table to be joined
+			@type meta_table: MetadataTable
+			@param on: name of key column or list of names of key columns available in both tables
+			@type on: int | long | str | unicode | list[int|long|str|unicode] | ColumnView
+			@param how: 'inner', 'left' or 'outer'
+			@type how: str | unicode
+			@param sorted_keys: If true, tables are merged by sorted keys
+			@type sorted_keys: bool
+			@param suffix: added to names of columns of the joined table that are already in use, until unused
+			@type suffix: str | unicode
+
+			@return: New table of key columns, the other columns of this table and the other columns of the joined table
+			@rtype: MetadataTable
+
+			@raises: ValueError
+		"""
+		if isinstance(on, ColumnView):
+			on = on.copy()
+		elif not isinstance(on, list):
+			on = [on]
+		assert isinstance(meta_table, MetadataTable)
+		assert len(on) > 0
+		assert how in ("inner", "left", "outer"), "Unsupported join: '{}'".format(how)
+		assert isinstance(sorted_keys, bool)
+		assert isinstance(suffix, basestring)
+		assert self.validate_column_names(on), "Key columns not found: {}".format(on)
+		assert meta_table.validate_column_names(on), "Key columns not found: {}".format(on)
+
+		left_key_columns = [self._meta_table[column_name] for column_name in on]
+		right_key_columns = [meta_table._meta_table[column_name] for column_name in on]
+		if sorted_keys:
+			if len(on) == 1:
+				left_keys = iter(left_key_columns[0])
+				right_keys = iter(right_key_columns[0])
+			else:
+				left_keys = izip(*left_key_columns)
+				right_keys = izip(*right_key_columns)
+			try:
+				left_indexes, right_indexes = merge_join(left_keys, right_keys, how)
+			except ValueError as e:
+				self._logger.error(str(e))
+				raise
+		else:
+			if len(on) == 1:
+				left_keys = left_key_columns[0]
+				right_keys = right_key_columns[0]
+			else:
+				left_keys = zip(*left_key_columns)
+				right_keys = zip(*right_key_columns)
+			left_indexes, right_indexes = hash_join(left_keys, right_keys, how)
+
+		result = MetadataTable(separator=self._separator, logfile=self._logfile, verbose=self._verbose)
+		result._number_of_rows = len(left_indexes)
+		for left_column, right_column, column_name in izip(left_key_columns, right_key_columns, on):
+			if how == "outer":
+				values = [
+					left_column[left] if left is not None else right_column[right]
+					for left, right in izip(left_indexes, right_indexes)]
+				result.insert_column(values, column_name)
+			else:
+				result._add_joined_column(self._meta_table[column_name], left_indexes, column_name)
+		for column_name in self._list_of_column_names:
+			if column_name not in on:
+				result._add_joined_column(self._meta_table[column_name], left_indexes, column_name)
+		for column_name in meta_table._list_of_column_names:
+			if column_name in on:
+				continue
+			new_column_name = column_name
+			if column_name in result._meta_table:
+				if isinstance(column_name, basestring):
+					new_column_name = column_name + suffix
+					while new_column_name in result._meta_table or new_column_name in meta_table._meta_table:
+						new_column_name += suffix
+				else:
+					new_column_name = len(result._list_of_column_names)
+					while new_column_name in result._meta_table or new_column_name in meta_table._meta_table:
+						new_column_name += 1
+			result._add_joined_column(meta_table._meta_table[column_name], right_indexes, new_column_name)
+		return result
+
+	def _add_joined_column(self, column, list_of_row_indexes, column_name):
+		"""
+			Add a column gathered from the rows of another table, with empty cells where a row index is None
+
+			@param column: column of other table
+			@type column: Column | LazyColumn
+			@param list_of_row_indexes: row indexes of the other table
+			@type list_of_row_indexes: list[int|None]
+			@param column_name: column name
+			@type column_name: int | long | str | unicode
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if None in list_of_row_indexes:
+			get_value = column.__getitem__
+			new_column = Column([get_value(index) if index is not None else '' for index in list_of_row_indexes])
+		else:
+			new_column = column.take(list_of_row_indexes)
+		assert column_name not in self._meta_table, "Column names must be unique!"
+		self._list_of_column_names.append(column_name)
+		self._meta_table[column_name] = new_column
+
 	def reduce_rows_to_subset(self, list_of_values, key_column_name):
 		"""
 			Keep rows at key values of a column
@@ -572,7 +1611,7 @@ class MetadataTable(Compress):
 			@attention:
 
 			@param list_of_values: Cell values of table column
-			@type list_of_values: list[str|unicode]
+			@type list_of_values: list[str|unicode] | set[str|unicode] | ColumnView
 			@param key_column_name: Column name
 			@type key_column_name: str | unicode
 
@@ -581,20 +1620,216 @@ class MetadataTable(Compress):
 		"""
 
 		assert isinstance(key_column_name, (basestring, int, long))
-		assert isinstance(list_of_values, list)
+		assert isinstance(list_of_values, (list, set, frozenset, ColumnView))
 		assert self.has_column(key_column_name), "Column '{}' not found!".format(key_column_name)
 
+		list_of_row_indexes = self._get_row_indexes(key_column_name, list_of_values)
 		new_meta_table = {}
 		for column_name in self._list_of_column_names:
-			new_meta_table[column_name] = []
-		column = self.get_column(key_column_name)
-		for index, value in enumerate(column):
-			if value not in list_of_values:
-				continue
-			for column_name in self._list_of_column_names:
-				new_meta_table[column_name].append(self._meta_table[column_name][index])
+			new_meta_table[column_name] = self._meta_table[column_name].take(list_of_row_indexes)
 		self._meta_table = new_meta_table
-		self._number_of_rows = len(self._meta_table[key_column_name])
+		self._number_of_rows = len(list_of_row_indexes)
+		for column_name in self._column_index.keys():
+			self.build_index(column_name)
+		self._number_of_rows_written = {}
+
+	def _get_row_indexes(self, key_column_name, list_of_values, exclude=False):
+		"""
+			Get indexes of rows with a value of a list in a key column
+
+			@param key_column_name: Column name
+			@type key_column_name: int | long | str | unicode
+			@param list_of_values: Cell values of key column
+			@type list_of_values: list[str|unicode] | set[str|unicode] | ColumnView
+			@param exclude: If True, indexes of rows without a value of the list are returned
+			@type exclude: bool
+
+			@return: Row indexes in ascending order
+			@rtype: list[int]
+		"""
+		value_set = frozenset(list_of_values)
+		is_selected = imap(value_set.__contains__, self._meta_table[key_column_name])
+		if exclude:
+			is_selected = imap(operator.not_, is_selected)
+		return list(compress(xrange(self._number_of_rows), is_selected))
+
+	def sort_by(self, key_column_names, reverse=False, numeric=False):
+		"""
+			Sort rows of the table by the values of key columns
+
+			@attention: The sort is stable, rows with equal keys keep their order
+
+			@param key_column_names: name of key column or list of names
+			@type key_column_names: int | long | str | unicode | list[int|long|str|unicode] | ColumnView
+			@param reverse: If true, rows are sorted in descending order
+			@type reverse: bool
+			@param numeric: If true, key values are compared as numbers
+			@type numeric: bool
+
+			@return: Nothing
+			@rtype: None
+
+			@raises: ValueError
+		"""
+		if isinstance(key_column_names, ColumnView):
+			key_column_names = key_column_names.copy()
+		elif not isinstance(key_column_names, list):
+			key_column_names = [key_column_names]
+		assert self.validate_column_names(key_column_names), "Key columns not found: {}".format(key_column_names)
+		assert isinstance(reverse, bool)
+		assert isinstance(numeric, bool)
+
+		list_of_keys = []
+		for column_name in key_column_names:
+			values = self._meta_table[column_name]
+			if numeric:
+				values = imap(to_number, values)
+			list_of_keys.append(list(values))
+		if len(list_of_keys) == 1:
+			list_of_keys = list_of_keys[0]
+		else:
+			list_of_keys = zip(*list_of_keys)
+		list_of_row_indexes = sorted(xrange(self._number_of_rows), key=list_of_keys.__getitem__, reverse=reverse)
+		for column_name in self._list_of_column_names:
+			self._meta_table[column_name] = self._meta_table[column_name].take(list_of_row_indexes)
+		for column_name in self._column_index.keys():
+			self.build_index(column_name)
+		self._number_of_rows_written = {}
+
+	def sort_file(
+		self, src, dst, key_column_names, separator=None, column_names=False, comment_line=None,
+		reverse=False, numeric=False, memory_budget=256 * 1024 * 1024, compression_level=0, temporary_directory=None):
+		"""
+			Sort rows of a file by the values of key columns, using sorted runs on disk for files larger than memory
+
+			@attention: No comments will be written. Like parse_file, it clears the table.
+
+			@param src: path to file to be sorted
+			@type src: str | unicode
+			@param dst: path to sorted file
+			@type dst: str | unicode
+			@param key_column_names: name or index of key column or list of them
+			@type key_column_names: int | long | str | unicode | list[int|long|str|unicode] | ColumnView
+			@param separator: default character assumed to separate values in a file
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: character or list of character indication comment lines
+			@type comment_line: str | unicode | list[str|unicode]
+			@param reverse: If true, rows are sorted in descending order
+			@type reverse: bool
+			@param numeric: If true, key values are compared as numbers
+			@type numeric: bool
+			@param memory_budget: approximate number of bytes of rows kept in memory before a sorted run is written
+			@type memory_budget: int | long
+			@param compression_level: any value above 0 will compress the sorted file
+			@type compression_level: int | long
+			@param temporary_directory: directory for sorted runs, default is the system temporary directory
+			@type temporary_directory: str | unicode | None
+
+			@return: Nothing
+			@rtype: None
+
+			@raises: ValueError
+		"""
+		if separator is None:
+			separator = self._separator
+		if isinstance(key_column_names, ColumnView):
+			key_column_names = key_column_names.copy()
+		elif not isinstance(key_column_names, list):
+			key_column_names = [key_column_names]
+
+		assert isinstance(src, basestring)
+		assert self.validate_file(src)
+		assert isinstance(dst, basestring)
+		assert self.validate_dir(dst, only_parent=True)
+		assert self.validate_number(memory_budget, minimum=1)
+		assert isinstance(compression_level, (int, long))
+		assert 0 <= compression_level < 10
+		assert temporary_directory is None or self.validate_dir(temporary_directory)
+
+		list_of_column_names = None
+		list_of_positions = key_column_names
+		if column_names:
+			list_of_column_names = self._read_column_names(src, separator)
+			list_of_positions = self._get_column_positions(list_of_column_names, key_column_names)
+		get_key = get_key_function(list_of_positions, numeric, reverse)
+
+		self._logger.info("Sorting file: '{}'".format(src))
+		directory = tempfile.mkdtemp(dir=temporary_directory)
+		try:
+			list_of_run_paths = []
+			rows = []
+			size = 0
+			for row in self.parse_file(src, separator, column_names, comment_line, as_list=True):
+				rows.append(row)
+				size += self._row_memory_overhead + self._cell_memory_overhead * len(row) + sum(map(len, row))
+				if size >= memory_budget:
+					list_of_run_paths.append(self._write_sorted_run(rows, get_key, separator, directory))
+					rows = []
+					size = 0
+
+			if len(list_of_run_paths) == 0:
+				rows.sort(key=get_key)
+				sorted_rows = rows
+			else:
+				if len(rows) > 0:
+					list_of_run_paths.append(self._write_sorted_run(rows, get_key, separator, directory))
+				rows = None
+				self._logger.info("Merging {} sorted runs".format(len(list_of_run_paths)))
+				sorted_rows = merge_runs([self._read_sorted_run(path, separator) for path in list_of_run_paths], get_key)
+
+			if compression_level > 0:
+				file_handler = self.open(dst, "w", compression_level)
+			else:
+				file_handler = open(dst, "w")
+			with file_handler:
+				if column_names:
+					file_handler.write(separator.join(list_of_column_names) + '\n')
+				for row in sorted_rows:
+					file_handler.write(separator.join(row) + '\n')
+		finally:
+			shutil.rmtree(directory)
+
+	def _write_sorted_run(self, rows, get_key, separator, directory):
+		"""
+			Sort rows and write them compressed to a temporary file
+
+			@param rows: cell values of rows
+			@type rows: list[list[str|unicode]]
+			@param get_key: returns the sort key of a row
+			@type get_key: (list[str|unicode]) -> object
+			@param separator: character separating values in a row
+			@type separator: str | unicode
+			@param directory: directory of temporary files
+			@type directory: str | unicode
+
+			@return: path to file
+			@rtype: str | unicode
+		"""
+		rows.sort(key=get_key)
+		file_descriptor, file_path = tempfile.mkstemp(suffix=".gz", dir=directory)
+		with os.fdopen(file_descriptor, "wb") as raw_file_handler:
+			with gzip.GzipFile(filename='', mode="wb", compresslevel=1, fileobj=raw_file_handler) as file_handler:
+				for row in rows:
+					file_handler.write(separator.join(row) + '\n')
+		return file_path
+
+	def _read_sorted_run(self, file_path, separator):
+		"""
+			Read rows of a temporary file
+
+			@param file_path: path to file
+			@type file_path: str | unicode
+			@param separator: character separating values in a row
+			@type separator: str | unicode
+
+			@return: Generator of rows
+			@rtype: generator[list[str|unicode]]
+		"""
+		with self.open(file_path) as file_handler:
+			for line in file_handler:
+				yield line.rstrip('\n').split(separator)
 
 	def get_map(self, key_column_name, value_column_name, unique_key=True):
 		"""
@@ -657,3 +1892,65 @@ class MetadataTable(Compress):
 
 		self._list_of_column_names[self._list_of_column_names.index(old_column_name)] = new_column_name
 		self._meta_table[new_column_name] = self._meta_table.pop(old_column_name)
+		if old_column_name in self._column_index:
+			self._column_index[new_column_name] = self._column_index.pop(old_column_name)
+
+
+def _parse_chunk(file_path, start, end, separator, comment_line, number_of_columns):
+	# workaround since pickling a method is a pain
+	"""
+		Parse a chunk of an uncompressed file into encoded columns
+
+		@attention: The chunk must start at the beginning of a line.
+		Columns are returned in binary form, which is cheap to pass between processes.
+		Columns of mostly unique values are passed as their packed buffer.
+
+		@param file_path: path to file
+		@type file_path: str | unicode
+		@param start: offset of chunk
+		@type start: int | long
+		@param end: offset of end of chunk
+		@type end: int | long
+		@param separator: character separating values in a row
+		@type separator: str | unicode
+		@param comment_line: list of character indicating comment lines
+		@type comment_line: list[str|unicode]
+		@param number_of_columns: expected number of values in a row
+		@type number_of_columns: int
+
+		@return: number of lines, number of rows, column type, data and pool of each column,
+		line number of a bad row within the chunk or None
+		@rtype: tuple[int, int, list[tuple[str|None, str, list[str]|str|None]], int|None]
+	"""
+	with open(file_path, 'rb') as file_handler:
+		file_handler.seek(start)
+		data = file_handler.read(end - start)
+	lines = data.split('\n')
+	if lines[-1] == '':
+		lines.pop()
+	if '\r' in data:
+		lines = [line.rstrip('\r') for line in lines]
+	del data
+
+	comment_characters = set(comment_line)
+	rows = [line for line in lines if line and line[0] not in comment_characters]
+	if len(rows) == 0:
+		return len(lines), 0, [(None, '', None)] * number_of_columns, None
+	if set([row.count(separator) for row in rows]) != {number_of_columns - 1}:
+		for index, line in enumerate(lines):
+			if line and line[0] not in comment_characters and line.count(separator) != number_of_columns - 1:
+				return len(lines), 0, None, index + 1
+	cells = separator.join(rows).split(separator)
+	list_of_buffers = []
+	for index in range(number_of_columns):
+		values = cells[index::number_of_columns]
+		column = Column(values)
+		if column.get_type() == Column._type_object:
+			list_of_buffers.append((Column._type_object, '\n'.join(values), None))
+		else:
+			list_of_buffers.append(column.to_buffers())
+	return len(lines), len(rows), list_of_buffers, None
+
+
+def _parse_chunk_task(args):
+	return _parse_chunk(*args)
@@ -1,9 +1,18 @@
 __author__ = 'hofmann'
 __version__ = '0.0.2'
 
+import os
 import io
 import StringIO
+import fnmatch
+import collections
+from multiprocessing.pool import ThreadPool
 from compress import Compress
+from scripts.Archive.parallelgzip import ParallelGzipWriter
+from scripts.Archive.readahead import iter_file_chunks
+from scripts.Archive.stream import ChunkReader, iter_decompressed_file
+from scripts.Archive.gzipindex import GzipIndex
+from scripts.Archive.archiveindex import ArchiveIndex
 import tarfile
 
 
@@ -39,6 +48,14 @@ class Archive(Compress):
 
 	_file_extensions_tar = ".tar"
 
+	# result of is_archive by path, modification time and size
+	_is_archive_cache = {}
+	_is_archive_cache_size = 1024
+
+	# loaded tables of contents by path, modification time and size
+	_archive_index_cache = {}
+	_archive_index_cache_size = 16
+
 	def __init__(self, default_compression="gz", logfile=None, verbose=True):
 		"""
 			Constructor
@@ -70,13 +87,23 @@ class Archive(Compress):
 		"""
 			Test if archive can be assumed by filename
 
+			@attention: Results are cached by path, modification time and size.
+
 			@param file_path: Path to file
 			@type file_path: str | unicode
 
 			@return: True if file is archive
 			@rtype: str | None
 		"""
-		return tarfile.is_tarfile(file_path)
+		file_stat = os.stat(file_path)
+		key = (os.path.abspath(file_path), file_stat.st_mtime, file_stat.st_size)
+		if key in Archive._is_archive_cache:
+			return Archive._is_archive_cache[key]
+		is_archive = tarfile.is_tarfile(file_path)
+		if len(Archive._is_archive_cache) >= Archive._is_archive_cache_size:
+			Archive._is_archive_cache.clear()
+		Archive._is_archive_cache[key] = is_archive
+		return is_archive
 
 	def open_archive(self, file_path, compression_type=None, mode='r'):
 		"""
@@ -100,3 +127,701 @@ class Archive(Compress):
 
 		mode = self._modes[mode][compression_type]
 		return self._open[compression_type](file_path, mode=mode)
+
+	@staticmethod
+	def _get_member_filter(members):
+		"""
+			Get a function testing if a member is selected
+
+			@param members: glob pattern of member names, function testing a tarfile.TarInfo, or None for all members
+			@type members: str | unicode | (tarfile.TarInfo) -> bool | None
+
+			@return: function testing a member
+			@rtype: (tarfile.TarInfo) -> bool
+		"""
+		if members is None:
+			return lambda tarinfo: True
+		if isinstance(members, basestring):
+			return lambda tarinfo: fnmatch.fnmatchcase(tarinfo.name, members)
+		assert callable(members), "Members must be a glob pattern or a function"
+		return members
+
+	def iter_members(self, file_path, members=None, compression_type=None, buffer_size=1024 * 1024):
+		"""
+			Stream through the files of an archive in one sequential pass, without extracting or seeking
+
+			@attention: A member must be read before the next one is yielded.
+
+			@param file_path: Path to archive or a stream of an archive
+			@type file_path: str | unicode | file
+			@param members: glob pattern of member names, function testing a tarfile.TarInfo, or None for all files
+			@type members: str | unicode | (tarfile.TarInfo) -> bool | None
+			@param compression_type: "gz", "bz2", None for detection by the first bytes
+			@type compression_type: str | unicode | None
+			@param buffer_size: number of bytes read from a member at once
+			@type buffer_size: int
+
+			@return: Generator of member information and file-like object of its content
+			@rtype: generator[tuple[tarfile.TarInfo, ChunkReader]]
+		"""
+		is_selected = self._get_member_filter(members)
+		if isinstance(file_path, basestring):
+			assert self.validate_file(file_path)
+			if compression_type is None:
+				compression_type = self.get_compression_type(file_path)
+			read_handler = self._open_decompressed(file_path, compression_type, buffer_size)
+		else:
+			assert self.is_stream(file_path)
+			read_handler = self.open(file_path, compression_type=compression_type)
+
+		try:
+			tar_file = tarfile.open(fileobj=read_handler, mode="r|")
+			try:
+				for tarinfo in tar_file:
+					if not tarinfo.isfile() or not is_selected(tarinfo):
+						continue
+					with ChunkReader(iter_file_chunks(tar_file.extractfile(tarinfo), buffer_size)) as file_handler:
+						yield tarinfo, file_handler
+			finally:
+				tar_file.close()
+		finally:
+			read_handler.close()
+
+	def _open_decompressed(self, file_path, compression_type, buffer_size=1024 * 1024):
+		"""
+			Open the uncompressed tar stream of an archive for reading it front to back
+
+			@attention: tarfile in pipe mode and BZ2File only read the first gzip member or bz2 stream,
+			so archives written in parallel are decompressed member by member instead.
+
+			@param file_path: path to archive
+			@type file_path: str | unicode
+			@param compression_type: compression of the archive, None or "tar" if uncompressed
+			@type compression_type: str | unicode | None
+			@param buffer_size: number of compressed bytes read at once
+			@type buffer_size: int
+
+			@return: file-like object of the uncompressed tar stream
+			@rtype: file | ChunkReader
+		"""
+		if compression_type is None or compression_type == "tar":
+			return open(file_path, 'rb')
+		codec = self._codecs.get(compression_type)
+		if codec is None or codec.new_decompressor is None:
+			return self.open(file_path, compression_type=compression_type)
+		return ChunkReader(iter_decompressed_file(file_path, codec.new_decompressor, buffer_size))
+
+	def _iter_paths(self, list_of_paths):
+		"""
+			Get files and directories to be archived with their name in an archive
+
+			@attention: Directories are added recursively, names are relative to the parent directory of a path
+
+			@param list_of_paths: paths of files and directories
+			@type list_of_paths: list[str|unicode]
+
+			@return: Generator of path and name in archive
+			@rtype: generator[tuple[str, str]]
+		"""
+		for path in list_of_paths:
+			path = self.get_full_path(path)
+			base_directory = os.path.dirname(path)
+			yield path, os.path.relpath(path, base_directory)
+			if not os.path.isdir(path) or os.path.islink(path):
+				continue
+			for directory, list_of_directories, list_of_file_names in os.walk(path):
+				list_of_directories.sort()
+				for name in sorted(list_of_directories) + sorted(list_of_file_names):
+					entry_path = os.path.join(directory, name)
+					yield entry_path, os.path.relpath(entry_path, base_directory)
+
+	def create(
+		self, list_of_paths, dst, compression_type=None, compresslevel=5, max_processors=1,
+		buffer_size=1024 * 1024, overwrite=False):
+		"""
+			Create an archive of files and directories
+
+			@attention: Files up to the buffer size are read in a pool of threads while one tar stream is written.
+			gz archives are compressed in parallel with more than one processor.
+
+			@param list_of_paths: paths of files and directories, directories are added recursively
+			@type list_of_paths: list[str|unicode]
+			@param dst: path of archive
+			@type dst: str | unicode
+			@param compression_type: "gz", "bz2", "tar" or a registered codec, assumed by filename if None
+			@type compression_type: str | unicode | None
+			@param compresslevel: Higher level is slower but likely smaller.
+			@type compresslevel: int
+			@param max_processors: Number of threads reading files and compressing
+			@type max_processors: int
+			@param buffer_size: number of bytes of tar stream buffered and maximum size of files read ahead
+			@type buffer_size: int
+			@param overwrite: If false, a path will renamed if not available
+			@type overwrite: bool
+
+			@return: path of archive
+			@rtype: str
+
+			@raises: IOError
+		"""
+		assert isinstance(list_of_paths, list)
+		assert self.validate_number(max_processors, minimum=1)
+		assert self.validate_number(buffer_size, minimum=1)
+		for path in list_of_paths:
+			if not os.path.exists(path):
+				msg = "File not found '{}'".format(path)
+				self._logger.error(msg)
+				raise IOError(msg)
+		dst = self.get_full_path(dst)
+		if not self.validate_dir(dst, only_parent=True):
+			msg = "Bad destination: '{}'".format(dst)
+			self._logger.error(msg)
+			raise IOError(msg)
+		if not overwrite:
+			dst = self.get_available_file_path(dst)
+		if compression_type is None:
+			compression_type = self._get_compression_type_by_extension(dst)
+		if compression_type is None:
+			compression_type = "tar"
+		assert compression_type == "tar" or compression_type in self._codecs, "Unknown compression type: '{}'".format(
+			compression_type)
+
+		self._logger.info("Creating archive '{}'".format(os.path.basename(dst)))
+		if compression_type == "tar":
+			file_handler = open(dst, 'wb')
+		elif compression_type == "gz" and max_processors > 1:
+			file_handler = ParallelGzipWriter(dst, 'w', compresslevel, max_processors, block_size=buffer_size)
+		else:
+			file_handler = self.open(dst, 'w', compresslevel, compression_type)
+		pool = ThreadPool(max_processors)
+		try:
+			tar_file = tarfile.open(fileobj=file_handler, mode="w|", bufsize=buffer_size)
+			pending = collections.deque()
+			for path, name in self._iter_paths(list_of_paths):
+				tarinfo = tar_file.gettarinfo(path, name)
+				data = None
+				if tarinfo.isreg() and tarinfo.size <= buffer_size:
+					data = pool.apply_async(_read_file, (path,))
+				pending.append((path, tarinfo, data))
+				while len(pending) > 4 * max_processors:
+					self._add_to_tar(tar_file, *pending.popleft())
+			while pending:
+				self._add_to_tar(tar_file, *pending.popleft())
+			tar_file.close()
+		finally:
+			pool.terminate()
+			file_handler.close()
+		return dst
+
+	def get_archive_index(self, file_path, spacing=None, save=True):
+		"""
+			Get the table of contents of an archive, building it if it is missing or outdated
+
+			@attention: Tables of contents are cached. Building reads the whole archive once.
+			For gzip compressed archives access points at gzip member starts are recorded in the same pass,
+			create archives with max_processors > 1 to get one member per block.
+
+			@param file_path: Path to archive
+			@type file_path: str | unicode
+			@param spacing: minimum number of uncompressed bytes between gzip access points
+			@type spacing: int | None
+			@param save: If True, a built index is written to a sidecar file
+			@type save: bool
+
+			@return: table of contents
+			@rtype: ArchiveIndex
+		"""
+		assert self.validate_file(file_path)
+		assert spacing is None or self.validate_number(spacing, minimum=1)
+		file_stat = os.stat(file_path)
+		key = (os.path.abspath(file_path), file_stat.st_mtime, file_stat.st_size)
+		if key in self._archive_index_cache:
+			return self._archive_index_cache[key]
+		index = ArchiveIndex(ArchiveIndex.get_index_path(file_path))
+		if len(self._archive_index_cache) >= self._archive_index_cache_size:
+			self._archive_index_cache.clear()
+		if index.is_valid(file_path):
+			index.load()
+			self._archive_index_cache[key] = index
+			return index
+		if spacing is None:
+			spacing = self._gzip_index_spacing
+		self._logger.info("Indexing archive: '{}'".format(file_path))
+		compression_type = self.get_compression_type(file_path)
+		if compression_type == "gz":
+			gzip_index = GzipIndex(GzipIndex.get_index_path(file_path))
+			with ChunkReader(gzip_index.iter_build(file_path, spacing)) as file_handler:
+				index.build(file_handler, gzip_index)
+		else:
+			with self._open_decompressed(file_path, compression_type) as file_handler:
+				index.build(file_handler)
+		if save:
+			try:
+				index.save(file_path)
+			except (IOError, ValueError) as e:
+				# names, which are not utf-8 encoded, can not be written
+				self._logger.warning("Could not write table of contents of '{}': {}".format(file_path, e))
+		self._archive_index_cache[key] = index
+		return index
+
+	def list_members(self, file_path, members=None):
+		"""
+			Get the members of an archive from its table of contents
+
+			@param file_path: Path to archive
+			@type file_path: str | unicode
+			@param members: glob pattern of member names, function testing a tarfile.TarInfo, or None for all members
+			@type members: str | unicode | (tarfile.TarInfo) -> bool | None
+
+			@return: member information in order of the archive
+			@rtype: list[tarfile.TarInfo]
+		"""
+		is_selected = self._get_member_filter(members)
+		index = self.get_archive_index(file_path)
+		list_of_tarinfo = [ArchiveIndex.get_tarinfo(member) for member in index.list_of_members]
+		return [tarinfo for tarinfo in list_of_tarinfo if is_selected(tarinfo)]
+
+	def read_member(self, file_path, name, buffer_size=1024 * 1024):
+		"""
+			Read a file of an archive using its table of contents
+
+			@attention: Uncompressed archives are read from the member position,
+			gzip compressed archives are decompressed from the last access point before the member,
+			other compressed archives are decompressed from the start.
+
+			@param file_path: Path to archive
+			@type file_path: str | unicode
+			@param name: member name
+			@type name: str | unicode
+			@param buffer_size: number of bytes read at once
+			@type buffer_size: int
+
+			@return: file-like object of the member content
+			@rtype: ChunkReader
+
+			@raises: IOError
+		"""
+		assert self.validate_number(buffer_size, minimum=1)
+		index = self.get_archive_index(file_path)
+		member = index.get_member(name)
+		if member is None or not ArchiveIndex.get_tarinfo(member).isreg():
+			msg = "No file '{}' in archive '{}'".format(name, file_path)
+			self._logger.error(msg)
+			raise IOError(msg)
+		tarinfo = ArchiveIndex.get_tarinfo(member)
+		compression_type = self.get_compression_type(file_path)
+		if compression_type is None:
+			chunks = _iter_file_range(file_path, tarinfo.offset_data, buffer_size)
+			skip = 0
+		elif compression_type == "gz" and index.gzip_index is not None:
+			point = index.gzip_index.get_point_of_offset(tarinfo.offset_data)
+			chunks = GzipIndex.iter_chunks(file_path, point)
+			skip = tarinfo.offset_data - point[1]
+		else:
+			chunks = iter_file_chunks(self._open_decompressed(file_path, compression_type, buffer_size), buffer_size)
+			skip = tarinfo.offset_data
+		return ChunkReader(_iter_chunk_range(chunks, skip, tarinfo.size))
+
+	def _get_target_path(self, tarinfo, dst):
+		"""
+			Get the path a member is extracted to, refusing paths outside of the destination
+
+			@attention: Links pointing outside of the destination are skipped with a warning.
+			A directory member of the destination itself, like '.', is extracted to the destination.
+
+			@param tarinfo: member information
+			@type tarinfo: tarfile.TarInfo
+			@param dst: destination directory
+			@type dst: str | unicode
+
+			@return: target path, None if the member is skipped
+			@rtype: str | unicode | None
+
+			@raises: IOError
+		"""
+		target_path = os.path.normpath(os.path.join(dst, tarinfo.name))
+		is_inside = target_path.startswith(dst + os.sep) or (tarinfo.isdir() and target_path == dst)
+		if os.path.isabs(tarinfo.name) or not is_inside:
+			msg = "Refusing to extract member outside of destination: '{}'".format(tarinfo.name)
+			self._logger.error(msg)
+			raise IOError(msg)
+		if tarinfo.issym():
+			link_target = os.path.normpath(os.path.join(os.path.dirname(target_path), tarinfo.linkname))
+		elif tarinfo.islnk():
+			link_target = os.path.normpath(os.path.join(dst, tarinfo.linkname))
+		else:
+			return target_path
+		if os.path.isabs(tarinfo.linkname) or not link_target.startswith(dst + os.sep):
+			self._logger.warning("Skipping link pointing outside of destination: '{}' -> '{}'".format(
+				tarinfo.name, tarinfo.linkname))
+			return None
+		return target_path
+
+	def extract(self, file_path, dst, members=None, max_processors=1, buffer_size=1024 * 1024):
+		"""
+			Extract files of an archive
+
+			@attention: Files of uncompressed archives are split across threads by size, each reading from its own position.
+			Gzip compressed archives with a valid table of contents are split across threads at access points.
+			Other compressed archives are extracted in one sequential pass.
+			Files are set to their final size before they are written, which on most file systems only creates a sparse file
+			and does not reserve disk blocks, so free space for all selected files is validated before extraction starts.
+
+			@param file_path: Path to archive
+			@type file_path: str | unicode
+			@param dst: destination directory
+			@type dst: str | unicode
+			@param members: glob pattern of member names, function testing a tarfile.TarInfo, or None for all members
+			@type members: str | unicode | (tarfile.TarInfo) -> bool | None
+			@param max_processors: Number of threads extracting files of an uncompressed or indexed archive
+			@type max_processors: int
+			@param buffer_size: number of bytes copied at once
+			@type buffer_size: int
+
+			@return: names of extracted members
+			@rtype: list[str]
+
+			@raises: IOError
+		"""
+		assert self.validate_file(file_path)
+		assert self.validate_dir(dst)
+		assert self.validate_number(max_processors, minimum=1)
+		assert self.validate_number(buffer_size, minimum=1)
+		dst = self.get_full_path(dst)
+		is_selected = self._get_member_filter(members)
+		self._logger.info("Extracting archive '{}'".format(os.path.basename(file_path)))
+		compression_type = self.get_compression_type(file_path)
+		if compression_type is None:
+			with tarfile.open(file_path, mode="r:") as tar_file:
+				list_of_tarinfo = tar_file.getmembers()
+			return self._extract_seekable(file_path, dst, list_of_tarinfo, is_selected, max_processors, buffer_size)
+		index = ArchiveIndex(ArchiveIndex.get_index_path(file_path))
+		required_space = None
+		if index.is_valid(file_path):
+			index.load()
+			list_of_tarinfo = [ArchiveIndex.get_tarinfo(member) for member in index.list_of_members]
+			is_indexed = index.gzip_index is not None and len(index.gzip_index.list_of_points) > 1
+			if compression_type == "gz" and is_indexed:
+				return self._extract_seekable(
+					file_path, dst, list_of_tarinfo, is_selected, max_processors, buffer_size, index.gzip_index)
+			required_space = sum(tarinfo.size for tarinfo in list_of_tarinfo if tarinfo.isreg() and is_selected(tarinfo))
+		return self._extract_stream(file_path, dst, is_selected, buffer_size, required_space)
+
+	def _extract_seekable(
+		self, file_path, dst, list_of_tarinfo, is_selected, max_processors, buffer_size, gzip_index=None):
+		"""
+			Extract files of an uncompressed or indexed gzip compressed archive in parallel
+
+			@param file_path: Path to archive
+			@type file_path: str | unicode
+			@param dst: absolute path of destination directory
+			@type dst: str | unicode
+			@param list_of_tarinfo: all members of the archive
+			@type list_of_tarinfo: list[tarfile.TarInfo]
+			@param is_selected: function testing a member
+			@type is_selected: (tarfile.TarInfo) -> bool
+			@param max_processors: Number of threads extracting files
+			@type max_processors: int
+			@param buffer_size: number of bytes copied at once
+			@type buffer_size: int
+			@param gzip_index: access points of a gzip compressed archive, None for an uncompressed archive
+			@type gzip_index: GzipIndex | None
+
+			@return: names of extracted members
+			@rtype: list[str]
+
+			@raises: IOError
+		"""
+		list_of_members = []
+		for tarinfo in list_of_tarinfo:
+			if not is_selected(tarinfo):
+				continue
+			target_path = self._get_target_path(tarinfo, dst)
+			if target_path is not None:
+				list_of_members.append((tarinfo, target_path))
+		required_space = sum(tarinfo.size for tarinfo, _ in list_of_members if tarinfo.isreg())
+		if not self.validate_free_space(dst, required_space_in_bytes=required_space):
+			msg = "Not enough free space to extract '{}'".format(file_path)
+			self._logger.error(msg)
+			raise IOError(msg)
+
+		# directories first, files in parallel, links last
+		list_of_files = []
+		for tarinfo, target_path in list_of_members:
+			if tarinfo.isdir():
+				if not os.path.isdir(target_path):
+					os.makedirs(target_path)
+			elif tarinfo.isreg():
+				if not os.path.isdir(os.path.dirname(target_path)):
+					os.makedirs(os.path.dirname(target_path))
+				list_of_files.append((tarinfo.offset_data, tarinfo.size, target_path, tarinfo.mode, tarinfo.mtime))
+
+		if gzip_index is None:
+			list_of_work = self._split_by_size(list_of_files, max_processors)
+			list_of_tasks = [(file_path, work, buffer_size, None) for work in list_of_work]
+		else:
+			# each thread decompresses a contiguous range, starting at the access point before its first file
+			list_of_work = self._split_contiguous(sorted(list_of_files), max_processors)
+			list_of_tasks = [
+				(file_path, work, buffer_size, gzip_index.get_point_of_offset(work[0][0])) for work in list_of_work]
+		pool = ThreadPool(max_processors)
+		try:
+			pool.map(_extract_files, list_of_tasks)
+		finally:
+			pool.terminate()
+
+		for tarinfo, target_path in list_of_members:
+			if tarinfo.issym() or tarinfo.islnk():
+				self._make_link(tarinfo, target_path, dst)
+			elif not tarinfo.isdir() and not tarinfo.isreg():
+				self._logger.warning("Skipping special file '{}'".format(tarinfo.name))
+		return [tarinfo.name for tarinfo, _ in list_of_members]
+
+	@staticmethod
+	def _split_by_size(list_of_files, number_of_parts):
+		"""
+			Split files into parts of similar total size, largest files first
+
+			@return: non-empty parts
+			@rtype: list[list[tuple]]
+		"""
+		list_of_parts = [[] for _ in xrange(number_of_parts)]
+		list_of_part_sizes = [0] * number_of_parts
+		for entry in sorted(list_of_files, key=lambda entry: entry[1], reverse=True):
+			index = list_of_part_sizes.index(min(list_of_part_sizes))
+			list_of_parts[index].append(entry)
+			list_of_part_sizes[index] += entry[1]
+		return [part for part in list_of_parts if part]
+
+	@staticmethod
+	def _split_contiguous(list_of_files, number_of_parts):
+		"""
+			Split files in order into consecutive parts of similar total size
+
+			@return: non-empty parts
+			@rtype: list[list[tuple]]
+		"""
+		part_size = sum(entry[1] for entry in list_of_files) / float(number_of_parts)
+		list_of_parts = [[]]
+		size = 0
+		for entry in list_of_files:
+			if size >= part_size * len(list_of_parts) and list_of_parts[-1]:
+				list_of_parts.append([])
+			list_of_parts[-1].append(entry)
+			size += entry[1]
+		return [part for part in list_of_parts if part]
+
+	def _make_link(self, tarinfo, target_path, dst):
+		"""
+			Create a symbolic or hard link of an extracted archive
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if os.path.lexists(target_path):
+			os.remove(target_path)
+		if not os.path.isdir(os.path.dirname(target_path)):
+			os.makedirs(os.path.dirname(target_path))
+		if tarinfo.issym():
+			os.symlink(tarinfo.linkname, target_path)
+			return
+		source_path = os.path.join(dst, tarinfo.linkname)
+		if not os.path.isfile(source_path):
+			self._logger.warning("Skipping hard link to a file not extracted: '{}'".format(tarinfo.name))
+			return
+		os.link(source_path, target_path)
+
+	def _extract_stream(self, file_path, dst, is_selected, buffer_size, required_space=None):
+		"""
+			Extract files of a compressed archive in one sequential pass
+
+			@attention: Without a table of contents member sizes are unknown before the pass,
+			so free space is validated for the size of the archive
+
+			@param file_path: Path to archive
+			@type file_path: str | unicode
+			@param dst: absolute path of destination directory
+			@type dst: str | unicode
+			@param is_selected: function testing a member
+			@type is_selected: (tarfile.TarInfo) -> bool
+			@param buffer_size: number of bytes copied at once
+			@type buffer_size: int
+			@param required_space: total size of the selected files from a table of contents, None if unknown
+			@type required_space: int | long | None
+
+			@return: names of extracted members
+			@rtype: list[str]
+		"""
+		if required_space is None:
+			required_space = os.path.getsize(file_path)
+		if not self.validate_free_space(dst, required_space_in_bytes=required_space):
+			msg = "Not enough free space to extract '{}'".format(file_path)
+			self._logger.error(msg)
+			raise IOError(msg)
+		compression_type = self.get_compression_type(file_path)
+		file_handler = self._open_decompressed(file_path, compression_type, buffer_size)
+		list_of_names = []
+		try:
+			tar_file = tarfile.open(fileobj=file_handler, mode="r|")
+			try:
+				for tarinfo in tar_file:
+					if not is_selected(tarinfo):
+						continue
+					target_path = self._get_target_path(tarinfo, dst)
+					if target_path is None:
+						continue
+					list_of_names.append(tarinfo.name)
+					if not tarinfo.isreg():
+						tar_file.extract(tarinfo, dst)
+						continue
+					if not os.path.isdir(os.path.dirname(target_path)):
+						os.makedirs(os.path.dirname(target_path))
+					read_handler = tar_file.extractfile(tarinfo)
+					with open(target_path, 'wb') as write_handler:
+						# sets the size only, the file may be sparse until it is written
+						write_handler.truncate(tarinfo.size)
+						for data in iter(lambda: read_handler.read(buffer_size), ''):
+							write_handler.write(data)
+					_set_attributes(target_path, tarinfo.mode, tarinfo.mtime)
+			finally:
+				tar_file.close()
+		finally:
+			file_handler.close()
+		return list_of_names
+
+	@staticmethod
+	def _add_to_tar(tar_file, path, tarinfo, data):
+		"""
+			Write a member to a tar stream
+
+			@param tar_file: tar file opened for writing
+			@type tar_file: tarfile.TarFile
+			@param path: path of file
+			@type path: str
+			@param tarinfo: member information
+			@type tarinfo: tarfile.TarInfo
+			@param data: content of a file read ahead, None if file is read now
+			@type data: multiprocessing.pool.AsyncResult | None
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if data is not None:
+			tar_file.addfile(tarinfo, StringIO.StringIO(data.get()))
+		elif tarinfo.isreg():
+			with open(path, 'rb') as file_handler:
+				tar_file.addfile(tarinfo, file_handler)
+		else:
+			tar_file.addfile(tarinfo)
+
+
+def _iter_file_range(file_path, offset, buffer_size):
+	"""
+		Read a file from an offset to its end in chunks
+
+		@param file_path: Path to file
+		@type file_path: str | unicode
+		@param offset: number of bytes skipped
+		@type offset: int
+		@param buffer_size: number of bytes per chunk
+		@type buffer_size: int
+
+		@return: Generator of chunks
+		@rtype: generator[str]
+	"""
+	with open(file_path, 'rb') as file_handler:
+		file_handler.seek(offset)
+		for data in iter(lambda: file_handler.read(buffer_size), ''):
+			yield data
+
+
+def _iter_chunk_range(chunks, skip, size):
+	"""
+		Get a range of data produced in chunks
+
+		@param chunks: iterator of data, closed when the range is complete
+		@type chunks: iterator[str]
+		@param skip: number of bytes before the range
+		@type skip: int
+		@param size: number of bytes in the range
+		@type size: int
+
+		@return: Generator of data of the range
+		@rtype: generator[str]
+
+		@raises: IOError
+	"""
+	try:
+		for data in chunks:
+			if skip >= len(data):
+				skip -= len(data)
+				continue
+			data = data[skip:skip + size]
+			skip = 0
+			size -= len(data)
+			if data:
+				yield data
+			if size == 0:
+				return
+		if size > 0:
+			raise IOError("Unexpected end of archive")
+	finally:
+		if hasattr(chunks, "close"):
+			chunks.close()
+
+
+def _set_attributes(file_path, mode, mtime):
+	os.chmod(file_path, mode & 0o7777)
+	os.utime(file_path, (mtime, mtime))
+
+
+def _extract_files(args):
+	"""
+		Copy files out of an archive
+
+		@attention: Files are read in order, from a gzip compressed archive they must be ordered by data offset
+
+		@param args: path to archive, list of data offset, size, target path, mode and modification time, buffer size,
+		access point of a gzip compressed archive or None for an uncompressed archive
+		@type args: tuple
+
+		@return: Nothing
+		@rtype: None
+
+		@raises: IOError
+	"""
+	file_path, list_of_files, buffer_size, point = args
+	if point is None:
+		read_handler = open(file_path, 'rb')
+	else:
+		read_handler = ChunkReader(GzipIndex.iter_chunks(file_path, point))
+		position = point[1]
+	try:
+		for offset_data, size, target_path, mode, mtime in list_of_files:
+			if point is None:
+				read_handler.seek(offset_data)
+			else:
+				while position < offset_data:
+					data = read_handler.read(min(buffer_size, offset_data - position))
+					if not data:
+						raise IOError("Unexpected end of archive '{}'".format(file_path))
+					position += len(data)
+				position += size
+			with open(target_path, 'wb') as write_handler:
+				# sets the size only, the file may be sparse until it is written
+				write_handler.truncate(size)
+				remaining = size
+				while remaining > 0:
+					data = read_handler.read(min(buffer_size, remaining))
+					if not data:
+						raise IOError("Unexpected end of archive '{}'".format(file_path))
+					write_handler.write(data)
+					remaining -= len(data)
+			_set_attributes(target_path, mode, mtime)
+	finally:
+		read_handler.close()
+
+
+def _read_file(file_path):
+	with open(file_path, 'rb') as file_handler:
+		return file_handler.read()
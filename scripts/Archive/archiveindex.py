@@ -0,0 +1,183 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import os
+import json
+import tarfile
+from scripts.Archive.gzipindex import GzipIndex
+
+
+class ArchiveIndex(object):
+	"""Table of contents of a tar archive"""
+
+	_version = 1
+	_read_size = 1024 * 1024
+
+	def __init__(self, index_path):
+		"""
+			Sidecar file of the members of an archive with their header and data offsets in the uncompressed tar stream
+
+			@attention: For gzip compressed archives the access points of a GzipIndex are stored along,
+			so reading a member only decompresses from the last access point before it.
+
+			@param index_path: path to index file
+			@type index_path: str | unicode
+
+			@return: None
+			@rtype: None
+		"""
+		self._index_path = index_path
+		# name, type, size, header offset, data offset, mode, modification time, link name
+		self.list_of_members = []
+		self._member_index = {}
+		self.gzip_index = None
+
+	@staticmethod
+	def get_index_path(file_path):
+		"""
+			Get path of the table of contents of an archive
+
+			@param file_path: path to archive
+			@type file_path: str | unicode
+
+			@return: path to index file
+			@rtype: str | unicode
+		"""
+		return file_path + ".toc"
+
+	@staticmethod
+	def _get_source_state(source_path):
+		stat = os.stat(source_path)
+		return {
+			"source_mtime": stat.st_mtime,
+			"source_size": stat.st_size,
+			}
+
+	def is_valid(self, source_path):
+		"""
+			Test if the index was built from the current state of an archive
+
+			@param source_path: path to archive
+			@type source_path: str | unicode
+
+			@return: True if index can be used
+			@rtype: bool
+		"""
+		if not os.path.isfile(self._index_path):
+			return False
+		try:
+			with open(self._index_path) as file_handler:
+				header = json.load(file_handler)
+		except ValueError:
+			return False
+		if header.get("version") != self._version:
+			return False
+		state = self._get_source_state(source_path)
+		return all(header.get(key) == value for key, value in state.iteritems())
+
+	def build(self, file_handler, gzip_index=None):
+		"""
+			Read all member headers of an uncompressed tar stream
+
+			@param file_handler: uncompressed tar stream, read to the end
+			@type file_handler: file | ChunkReader
+			@param gzip_index: access points recorded while the stream is read
+			@type gzip_index: GzipIndex | None
+
+			@return: Nothing
+			@rtype: None
+		"""
+		list_of_members = []
+		tar_file = tarfile.open(fileobj=file_handler, mode="r|")
+		try:
+			for tarinfo in tar_file:
+				list_of_members.append((
+					tarinfo.name, tarinfo.type, tarinfo.size, tarinfo.offset, tarinfo.offset_data,
+					tarinfo.mode, tarinfo.mtime, tarinfo.linkname))
+		finally:
+			tar_file.close()
+		# padding after the end of the archive
+		for _ in iter(lambda: file_handler.read(self._read_size), ''):
+			pass
+		self._set_members(list_of_members)
+		self.gzip_index = gzip_index
+
+	def _set_members(self, list_of_members):
+		self.list_of_members = list_of_members
+		self._member_index = dict((member[0], index) for index, member in enumerate(list_of_members))
+
+	def save(self, source_path):
+		"""
+			Write the index next to the archive
+
+			@param source_path: path to archive the index was built of
+			@type source_path: str | unicode
+
+			@return: Nothing
+			@rtype: None
+		"""
+		header = self._get_source_state(source_path)
+		header["version"] = self._version
+		header["members"] = self.list_of_members
+		if self.gzip_index is not None:
+			header["gzip"] = self.gzip_index.to_dict()
+		with open(self._index_path, 'w') as file_handler:
+			json.dump(header, file_handler)
+
+	def load(self):
+		"""
+			Read the index
+
+			@return: Nothing
+			@rtype: None
+		"""
+		with open(self._index_path) as file_handler:
+			header = json.load(file_handler)
+		self._set_members([tuple(_to_str(value) for value in member) for member in header["members"]])
+		self.gzip_index = None
+		if "gzip" in header:
+			self.gzip_index = GzipIndex(GzipIndex.get_index_path(self._index_path))
+			self.gzip_index.update(header["gzip"])
+
+	@staticmethod
+	def get_tarinfo(member):
+		"""
+			Get member information of an entry
+
+			@param member: entry of the table of contents
+			@type member: tuple
+
+			@return: member information
+			@rtype: tarfile.TarInfo
+		"""
+		name, member_type, size, offset, offset_data, mode, mtime, linkname = member
+		tarinfo = tarfile.TarInfo(name)
+		tarinfo.type = member_type
+		tarinfo.size = size
+		tarinfo.offset = offset
+		tarinfo.offset_data = offset_data
+		tarinfo.mode = mode
+		tarinfo.mtime = mtime
+		tarinfo.linkname = linkname
+		return tarinfo
+
+	def get_member(self, name):
+		"""
+			Get the entry of a member
+
+			@param name: member name
+			@type name: str | unicode
+
+			@return: entry of the table of contents, None if there is no such member
+			@rtype: tuple | None
+		"""
+		if name not in self._member_index:
+			return None
+		return self.list_of_members[self._member_index[name]]
+
+
+def _to_str(value):
+	# json loads strings as unicode, tarfile uses utf-8 encoded names
+	if isinstance(value, unicode):
+		return value.encode("utf-8")
+	return value
@@ -0,0 +1,170 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import gzip
+import bz2
+import zlib
+import zipfile
+
+try:
+	import lzma
+except ImportError:
+	try:
+		from backports import lzma
+	except ImportError:
+		lzma = None
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+try:
+	import lz4.frame
+except ImportError:
+	lz4 = None
+
+
+class Codec(object):
+	"""Compression format a file can be opened with"""
+
+	def __init__(
+		self, name, list_of_extensions, open_function, minimum_level=0, maximum_level=9, default_level=5, append=False,
+		list_of_magic_numbers=None, new_decompressor=None):
+		"""
+			Compression format
+
+			@param name: compression type, like 'gz'
+			@type name: str | unicode
+			@param list_of_extensions: file extensions including the dot
+			@type list_of_extensions: list[str|unicode]
+			@param open_function: returns a file handler for a file path, a mode 'r', 'w' or 'a' and a compression level
+			@type open_function: (str|unicode, str|unicode, int) -> file
+			@param minimum_level: lowest compression level
+			@type minimum_level: int
+			@param maximum_level: highest compression level
+			@type maximum_level: int
+			@param default_level: compression level used when none is given
+			@type default_level: int
+			@param append: True if opening a file in mode 'a' adds data to it
+			@type append: bool
+			@param list_of_magic_numbers: bytes a compressed file starts with
+			@type list_of_magic_numbers: list[str]
+			@param new_decompressor: returns an object decompressing data of one stream, None if streams are not supported
+			@type new_decompressor: () -> zlib.Decompress | bz2.BZ2Decompressor | None
+
+			@return: None
+			@rtype: None
+		"""
+		assert minimum_level <= default_level <= maximum_level
+		self.name = name
+		self.list_of_extensions = list_of_extensions
+		self.minimum_level = minimum_level
+		self.maximum_level = maximum_level
+		self.default_level = default_level
+		self.append = append
+		self.list_of_magic_numbers = list_of_magic_numbers or []
+		self.new_decompressor = new_decompressor
+		self._open_function = open_function
+
+	def is_magic_number(self, data):
+		"""
+			Test if data starts with a magic number of the format
+
+			@param data: first bytes of a file
+			@type data: str
+
+			@return: True if data has the magic number
+			@rtype: bool
+		"""
+		return any(data.startswith(magic_number) for magic_number in self.list_of_magic_numbers)
+
+	def open(self, file_path, mode='r', compresslevel=None):
+		"""
+			Open a file
+
+			@param file_path: Path to file
+			@type file_path: str | unicode
+			@param mode: 'r', 'w' or 'a'
+			@type mode: str | unicode
+			@param compresslevel: compression level, default level if None
+			@type compresslevel: int | None
+
+			@return: file handler
+			@rtype: file
+		"""
+		if compresslevel is None:
+			compresslevel = self.default_level
+		return self._open_function(file_path, mode.rstrip('b'), compresslevel)
+
+
+def _open_gz(file_path, mode, compresslevel):
+	return gzip.open(file_path, mode + 'b', compresslevel)
+
+
+def _open_bz2(file_path, mode, compresslevel):
+	return bz2.BZ2File(file_path, mode, compresslevel=compresslevel)
+
+
+def _open_zip(file_path, mode, compresslevel):
+	if mode == 'r':
+		return zipfile.ZipFile(file_path, mode=mode)
+	return zipfile.ZipFile(file_path, mode=mode, compression=compresslevel)
+
+
+def _open_xz(file_path, mode, compresslevel):
+	if mode == 'r':
+		return lzma.open(file_path, 'rb')
+	return lzma.open(file_path, mode + 'b', preset=compresslevel)
+
+
+def _open_zstd(file_path, mode, compresslevel):
+	if mode == 'r':
+		return zstandard.open(file_path, 'rb')
+	return zstandard.open(file_path, mode + 'b', cctx=zstandard.ZstdCompressor(level=compresslevel))
+
+
+def _open_lz4(file_path, mode, compresslevel):
+	return lz4.frame.open(file_path, mode + 'b', compression_level=compresslevel)
+
+
+# stream header 'BZh' and block size, followed by the magic number of a block or of the end of an empty stream
+_bz2_magic_numbers = [
+	"BZh{}{}".format(level, block_magic) for level in range(1, 10) for block_magic in ("1AY&SY", "\x17rE8P\x90")]
+
+
+def _new_gz_decompressor():
+	return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+def _new_zstd_decompressor():
+	return zstandard.ZstdDecompressor().decompressobj()
+
+
+def get_default_codecs():
+	"""
+		Get built-in codecs and codecs of installed optional packages
+
+		@attention: xz requires lzma or backports.lzma, zstd requires zstandard, lz4 requires lz4
+
+		@return: codecs
+		@rtype: list[Codec]
+	"""
+	list_of_codecs = [
+		Codec("gz", [".gz"], _open_gz, append=True, list_of_magic_numbers=["\x1f\x8b"], new_decompressor=_new_gz_decompressor),
+		Codec("bz2", [".bz2"], _open_bz2, minimum_level=1, list_of_magic_numbers=_bz2_magic_numbers, new_decompressor=bz2.BZ2Decompressor),
+		Codec("zip", [".zip"], _open_zip, maximum_level=8, list_of_magic_numbers=["PK\x03\x04", "PK\x05\x06"]),
+		]
+	if lzma is not None:
+		list_of_codecs.append(Codec(
+			"xz", [".xz"], _open_xz, default_level=6, append=True,
+			list_of_magic_numbers=["\xfd7zXZ\x00"], new_decompressor=lzma.LZMADecompressor))
+	if zstandard is not None and hasattr(zstandard, "open"):
+		list_of_codecs.append(Codec(
+			"zst", [".zst", ".zstd"], _open_zstd, minimum_level=1, maximum_level=22, default_level=3,
+			list_of_magic_numbers=["\x28\xb5\x2f\xfd"], new_decompressor=_new_zstd_decompressor))
+	if lz4 is not None:
+		list_of_codecs.append(Codec(
+			"lz4", [".lz4"], _open_lz4, maximum_level=16, default_level=0,
+			list_of_magic_numbers=["\x04\x22\x4d\x18"], new_decompressor=lz4.frame.LZ4FrameDecompressor))
+	return list_of_codecs
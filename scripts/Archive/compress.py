@@ -6,11 +6,21 @@ import io
 import StringIO
 import time
 import datetime
+import shutil
+import tempfile
+import resource
+import multiprocessing as mp
 from scripts.Validator.validator import Validator
 import gzip
 import bz2
 import zipfile
+import tarfile
 from scripts.parallel import TaskThread, runThreadParallel
+from scripts.Archive.parallelgzip import ParallelGzipWriter
+from scripts.Archive.readahead import ReadAheadReader, iter_file_chunks, iter_bz2_streams
+from scripts.Archive.codec import get_default_codecs
+from scripts.Archive.stream import ChunkReader, PeekableStream, iter_decompressed_chunks, iter_decompressed_file
+from scripts.Archive.gzipindex import GzipIndex
 
 
 class Compress(Validator):
@@ -18,22 +28,26 @@ class Compress(Validator):
 
 	_label = "Compress"
 
+	# filled by register_codec
+	_codecs = {}
+
 	_open = {
-		"gz": gzip.open,
-		"bz2": bz2.BZ2File,
-		"zip": zipfile.ZipFile,
-		# "7z": tarfile.open,
 		None: open,
 		}
 
-	_file_extensions_compression = {
-		".zip": "zip",
-		# ".7z": "7z",
-		".gz": "gz",
-		".bz2": "bz2",
-		}
+	_file_extensions_compression = {}
+
+	# compression type of files by path, modification time and size
+	_compression_type_cache = {}
+	_compression_type_cache_size = 1024
 
-	_modes = ['r', 'w']
+	# compression type and level chosen by data class and targets
+	_auto_compression_cache = {}
+	_default_target_throughput = 20.
+
+	_gzip_index_spacing = 4 * 1024 * 1024
+
+	_modes = ['r', 'w', 'a']
 
 	def __init__(self, default_compression="gz", logfile=None, verbose=True):
 		"""
@@ -63,8 +77,73 @@ class Compress(Validator):
 		# 	self._logger.set_log_file(logfile)
 
 		self._default_compression = default_compression
+		# indexes of a single access point are not written, they are kept for the files read by this instance
+		self._single_point_gzip_indexes = {}
+
+	@classmethod
+	def register_codec(cls, codec):
+		"""
+			Add a compression format
+
+			@param codec: compression format
+			@type codec: scripts.Archive.codec.Codec
+
+			@return: Nothing
+			@rtype: None
+		"""
+		cls._codecs[codec.name] = codec
+		cls._open[codec.name] = codec.open
+		for extension in codec.list_of_extensions:
+			cls._file_extensions_compression[extension] = codec.name
+
+	@staticmethod
+	def is_stream(stream):
+		"""
+			Test for streams, including handlers of compressed files
+
+			@param stream: Any kind of stream type
+			@type stream: file | io.FileIO | StringIO.StringIO | gzip.GzipFile | bz2.BZ2File | tarfile.ExFileObject | ChunkReader
+
+			@return: True if stream
+			@rtype: bool
+		"""
+		if Validator.is_stream(stream):
+			return True
+		return isinstance(stream, (gzip.GzipFile, bz2.BZ2File, zipfile.ZipExtFile, tarfile.ExFileObject, ChunkReader, ParallelGzipWriter))
 
 	def get_compression_type(self, file_path):
+		"""
+			Return compression type of a file, detected by its first bytes
+
+			@attention: The type of files that do not exist or are empty is assumed by filename.
+			Results are cached by path, modification time and size.
+
+			@param file_path: Path to file or a stream that has not been read from
+			@type file_path: str | unicode | PeekableStream
+
+			@return: compression type, None if no compression
+			@rtype: str | None
+		"""
+		if isinstance(file_path, PeekableStream):
+			return self._get_compression_type_of_data(file_path.peek(self._get_magic_number_size()))
+		assert isinstance(file_path, basestring)
+		if not os.path.isfile(file_path):
+			return self._get_compression_type_by_extension(file_path)
+		file_stat = os.stat(file_path)
+		if file_stat.st_size == 0:
+			return self._get_compression_type_by_extension(file_path)
+
+		key = (os.path.abspath(file_path), file_stat.st_mtime, file_stat.st_size)
+		if key in self._compression_type_cache:
+			return self._compression_type_cache[key]
+		with open(file_path, 'rb') as file_handler:
+			compression_type = self._get_compression_type_of_data(file_handler.read(self._get_magic_number_size()))
+		if len(self._compression_type_cache) >= self._compression_type_cache_size:
+			self._compression_type_cache.clear()
+		self._compression_type_cache[key] = compression_type
+		return compression_type
+
+	def _get_compression_type_by_extension(self, file_path):
 		"""
 			Return compression type assumed by filename
 
@@ -76,53 +155,159 @@ class Compress(Validator):
 		"""
 		assert isinstance(file_path, basestring)
 		filename, extension = os.path.splitext(file_path)
+		return self._file_extensions_compression.get(extension)
 
-		if extension == ".zip" and not zipfile.is_zipfile(file_path):
-			return None
+	def _get_magic_number_size(self):
+		return max(len(magic_number) for codec in self._codecs.itervalues() for magic_number in codec.list_of_magic_numbers)
 
-		if extension in self._file_extensions_compression:
-			return self._file_extensions_compression[extension]
-		else:
-			return None
+	def _get_compression_type_of_data(self, data):
+		"""
+			Return compression type of data by its magic number
+
+			@param data: first bytes of a file
+			@type data: str
+
+			@return: compression type, None if no compression
+			@rtype: str | None
+		"""
+		for compression_type, codec in self._codecs.iteritems():
+			if codec.is_magic_number(data):
+				return compression_type
+		return None
 
-	def open(self, file_path, mode='r', compresslevel=5, compression_type=None):
+	def open(self, file_path, mode='r', compresslevel=5, compression_type=None, max_processors=1):
 		"""
 			Open a file for reading or writing
 
-			@attention: When reading file and compression_type None, type will be guessed.
+			@attention: When compression_type is None, the type is detected by the first bytes of a file read or appended to
+			and assumed by filename for files written. Streams can only be read.
 
-			@param file_path: Path to file
-			@type file_path: str | unicode
-			@param mode: mode a file is opened with. 'r' or 'w'
+			@param file_path: Path to file or a stream, which does not need to be seekable
+			@type file_path: str | unicode | file
+			@param mode: mode a file is opened with. 'r', 'w' or 'a'. Appending is supported for uncompressed and gz files.
 			@type mode: str | unicode
-			@param compresslevel: Higher level is slower but likely smaller. 0-9, except zip 0-8.
+			@param compresslevel: Higher level is slower but likely smaller. 0-9, except zip 0-8, zst 1-22, lz4 0-16.
 			@type compresslevel: int
-			@param compression_type: "zip", "gz", "bz2",
+			@param compression_type: "zip", "gz", "bz2", "xz", "zst", "lz4", if available
 			@type compression_type: str | unicode
+			@param max_processors: Number of threads compressing blocks of a gz file written or appended to.
+			Compressed files are read ahead in a separate thread, the streams of bz2 files are decompressed simultaneously.
+			@type max_processors: int
 
 			@return: Return a file object
-			@rtype: file
+			@rtype: file | ParallelGzipWriter | ChunkReader | ReadAheadReader
 		"""
 		assert mode in self._modes, "Unsupported mode '{}'.".format(mode)
-		if compression_type is None:
+		assert self.validate_number(max_processors, minimum=1)
+		if not isinstance(file_path, basestring):
+			assert mode == 'r', "Streams can only be read."
+			return self._open_stream(file_path, compression_type)
+		if compression_type is None and mode == 'w':
+			compression_type = self._get_compression_type_by_extension(file_path)
+		elif compression_type is None:
 			compression_type = self.get_compression_type(file_path)
-		if mode == 'r':
+		if compression_type is None:
+			return open(file_path, mode=mode)
+		if compression_type not in self._codecs:
+			assert compression_type in self._open, "Unknown compression type: '{}'".format(compression_type)
 			return self._open[compression_type](file_path, mode=mode)
-		elif compression_type == "gz":
-			assert self.validate_number(compresslevel, minimum=0, maximum=9)
-			return self._open[compression_type](file_path, mode='w', compresslevel=compresslevel)
-		elif compression_type == "bz2":
-			assert self.validate_number(compresslevel, minimum=0, maximum=9)
-			return self._open[compression_type](file_path, mode='w', compresslevel=compresslevel)
-		elif compression_type == "zip":
-			assert self.validate_number(compresslevel, minimum=0, maximum=8)
-			return self._open[compression_type](file_path, mode='w', compression=compresslevel)
-
-	def compress_file(self, src, dst='./', compresslevel=5, compression_type=None, overwrite=False):
+		codec = self._codecs[compression_type]
+		if mode == 'r':
+			if max_processors > 1 and compression_type == "bz2":
+				return ReadAheadReader(iter_bz2_streams(file_path, max_processors))
+			if compression_type == "bz2":
+				# BZ2File of Python 2 stops after the first stream
+				return ChunkReader(iter_decompressed_file(file_path, codec.new_decompressor))
+			if max_processors > 1:
+				return ReadAheadReader(iter_file_chunks(codec.open(file_path, mode)))
+			return codec.open(file_path, mode)
+		assert self.validate_number(compresslevel, minimum=codec.minimum_level, maximum=codec.maximum_level)
+		# appending adds a new compressed stream, like a gzip member
+		assert mode == 'w' or codec.append, "Appending to '{}' files is not supported.".format(compression_type)
+		if max_processors > 1 and compression_type == "gz":
+			return ParallelGzipWriter(file_path, mode, compresslevel, max_processors)
+		return codec.open(file_path, mode, compresslevel)
+
+	def _open_stream(self, stream, compression_type=None):
+		"""
+			Read a stream, decompressing it without seeking
+
+			@param stream: stream
+			@type stream: file | io.FileIO | StringIO.StringIO
+			@param compression_type: compression type, detected by the first bytes if None
+			@type compression_type: str | unicode | None
+
+			@return: file-like reader
+			@rtype: PeekableStream | ChunkReader
+		"""
+		assert self.is_stream(stream)
+		stream = PeekableStream(stream)
+		if compression_type is None:
+			compression_type = self.get_compression_type(stream)
+		if compression_type is None:
+			return stream
+		assert compression_type in self._codecs, "Unknown compression type: '{}'".format(compression_type)
+		codec = self._codecs[compression_type]
+		assert codec.new_decompressor is not None, "Reading '{}' streams is not supported.".format(compression_type)
+		return ChunkReader(iter_decompressed_chunks(stream, codec.new_decompressor))
+
+	def get_gzip_index(self, file_path, spacing=None, save=True):
+		"""
+			Get the access points of a gzip file, building the index if it is missing or outdated
+
+			@attention: Access points are at member starts. Write files with max_processors > 1 to get one member per block.
+			An index of a single access point is not written to a sidecar file, but kept in memory.
+
+			@param file_path: Path to gzip file
+			@type file_path: str | unicode
+			@param spacing: minimum number of uncompressed bytes between access points
+			@type spacing: int | None
+			@param save: If True, a built index is written to a sidecar file
+			@type save: bool
+
+			@return: index
+			@rtype: GzipIndex
+
+			@raises: IOError
+		"""
+		assert self.validate_file(file_path)
+		assert spacing is None or self.validate_number(spacing, minimum=1)
+		if self.get_compression_type(file_path) != "gz":
+			msg = "Not a gzip file: '{}'".format(file_path)
+			self._logger.error(msg)
+			raise IOError(msg)
+		full_path = self.get_full_path(file_path)
+		stat = os.stat(full_path)
+		source_state = (stat.st_mtime, stat.st_size)
+		if full_path in self._single_point_gzip_indexes:
+			cached_state, cached_spacing, index = self._single_point_gzip_indexes[full_path]
+			if cached_state == source_state and spacing in (None, cached_spacing):
+				return index
+		index = GzipIndex(GzipIndex.get_index_path(file_path))
+		if index.is_valid(file_path, spacing):
+			index.load()
+			return index
+		if spacing is None:
+			spacing = self._gzip_index_spacing
+		self._logger.info("Indexing gzip file: '{}'".format(file_path))
+		index.build(file_path, spacing)
+		if len(index.list_of_points) == 1:
+			self._single_point_gzip_indexes[full_path] = (source_state, spacing, index)
+		elif save:
+			try:
+				index.save(file_path)
+			except IOError as e:
+				self._logger.warning("Could not write gzip index of '{}': {}".format(file_path, e))
+		return index
+
+	def compress_file(
+		self, src, dst='./', compresslevel=5, compression_type=None, overwrite=False, max_processors=1,
+		chunk_size=1024 * 1024, target_throughput=None, target_ratio=None, data_class=None):
 		"""
 			Compress a file
 
 			@attention: When reading file and compression_type None, type will be guessed.
+			With compression_type "auto", type and level are chosen by benchmarking a sample of the file.
 
 			@param src: Path to file
 			@type src: str | unicode
@@ -130,16 +315,29 @@ class Compress(Validator):
 			@type dst: str | unicode
 			@param compresslevel: Higher level is slower but likely smaller. 0-9, except zip 0-8.
 			@type compresslevel: int
-			@param compression_type: "zip", "gz", "bz2",
+			@param compression_type: "zip", "gz", "bz2", "auto"
 			@type compression_type: str | unicode
 			@param overwrite: If false, a path will renamed if not available
 			@type overwrite: bool
+			@param max_processors: Number of threads compressing blocks of a gz file
+			@type max_processors: int
+			@param chunk_size: number of bytes copied at once
+			@type chunk_size: int
+			@param target_throughput: minimum compression throughput in MB/s for compression type "auto"
+			@type target_throughput: float | None
+			@param target_ratio: minimum compression ratio for compression type "auto"
+			@type target_ratio: float | None
+			@param data_class: files of a data class share the choice of compression type "auto", the file extension if None
+			@type data_class: str | unicode | None
 
 			@return: True if stream
 			@rtype: None
 		"""
+		assert self.validate_number(chunk_size, minimum=1)
+		if compression_type == "auto":
+			compression_type, compresslevel = self.choose_compression(src, target_throughput, target_ratio, data_class)
 		if compression_type is None:
-			compression_type = self.get_compression_type(dst)
+			compression_type = self._get_compression_type_by_extension(dst)
 		if compression_type is None:
 			compression_type = self._default_compression
 		compression_type = compression_type.lower()
@@ -162,12 +360,157 @@ class Compress(Validator):
 		if not overwrite:
 			dst = self.get_available_file_path(dst)
 
-		with open(src, 'rb') as read_handler, self.open(dst, 'w', compresslevel, compression_type) as write_handler:
-			write_handler.writelines(read_handler)
+		with open(src, 'rb') as read_handler, self.open(dst, 'w', compresslevel, compression_type, max_processors) as write_handler:
+			size = self._copy_stream(read_handler, write_handler, chunk_size)
 
 		time_end = time.time()
 		time_elapsed = str(datetime.timedelta(seconds=round(time_end - time_start)))
-		self._logger.info("Done compressing '{file}' in {time}s.\n".format(time=time_elapsed, file=os.path.basename(dst)))
+		throughput = size / 1024. / 1024. / max(time_end - time_start, 1e-6)
+		self._logger.info("Done compressing '{file}' in {time}s, {throughput:.1f} MB/s.\n".format(
+			time=time_elapsed, file=os.path.basename(dst), throughput=throughput))
+
+	def benchmark(self, file_path, sample_size=4 * 1024 * 1024, list_of_compression_types=None, list_of_levels=None):
+		"""
+			Compress and decompress a sample of a file with each codec and level
+
+			@attention: Only codecs that can be streamed are measured, which excludes zip.
+			Each measurement runs in a new process, so memory is the peak resident memory of compressing and decompressing.
+
+			@param file_path: Path to file, decompressed if compressed
+			@type file_path: str | unicode
+			@param sample_size: number of bytes from the start of the file
+			@type sample_size: int
+			@param list_of_compression_types: compression types measured, all if None
+			@type list_of_compression_types: list[str|unicode] | None
+			@param list_of_levels: compression levels measured, all levels of a codec if None
+			@type list_of_levels: list[int] | None
+
+			@return: per codec and level: compression_type, level, compression and decompression MB/s, ratio and memory in bytes
+			@rtype: list[dict[str, str|int|float]]
+		"""
+		assert self.validate_file(file_path)
+		assert self.validate_number(sample_size, minimum=1)
+		if list_of_compression_types is None:
+			list_of_compression_types = sorted(self._codecs.keys())
+		for compression_type in list_of_compression_types:
+			assert compression_type in self._codecs, "Unknown compression type: '{}'".format(compression_type)
+
+		with self.open(file_path) as file_handler:
+			sample = file_handler.read(sample_size)
+		if len(sample) == 0:
+			msg = "Empty file can not be benchmarked: '{}'".format(file_path)
+			self._logger.error(msg)
+			raise ValueError(msg)
+
+		temporary_directory = tempfile.mkdtemp(prefix="benchmark_")
+		results = []
+		try:
+			sample_path = os.path.join(temporary_directory, "sample")
+			with open(sample_path, 'wb') as file_handler:
+				file_handler.write(sample)
+			del sample
+			for compression_type in list_of_compression_types:
+				codec = self._codecs[compression_type]
+				if codec.new_decompressor is None:
+					continue
+				levels = list_of_levels
+				if levels is None:
+					levels = range(codec.minimum_level, codec.maximum_level + 1)
+				for level in levels:
+					if not codec.minimum_level <= level <= codec.maximum_level:
+						continue
+					pool = mp.Pool(processes=1, maxtasksperchild=1)
+					try:
+						result = pool.apply(_benchmark_codec, (compression_type, level, sample_path))
+					finally:
+						pool.terminate()
+					if isinstance(result, basestring):
+						self._logger.warning("Benchmark of {} {} failed: {}".format(compression_type, level, result))
+						continue
+					self._logger.info(
+						"{compression_type} {level}: {compression:.1f} MB/s, decompression {decompression:.1f} MB/s, "
+						"ratio {ratio:.2f}, memory {memory} bytes".format(**result))
+					results.append(result)
+		finally:
+			shutil.rmtree(temporary_directory)
+		return results
+
+	def choose_compression(self, file_path, target_throughput=None, target_ratio=None, data_class=None):
+		"""
+			Choose compression type and level meeting a target compression throughput or ratio
+
+			@attention: Without targets, the best ratio of at least 20 MB/s is chosen.
+			If no codec meets the targets, the fastest one is chosen for a throughput target, the smallest one otherwise.
+			Choosing benchmarks every codec and level in separate processes, about 10 s for a sample of 4 MB.
+			The choice is cached per data class, which defaults to the file extension.
+
+			@param file_path: Path to file a sample is benchmarked of
+			@type file_path: str | unicode
+			@param target_throughput: minimum compression throughput in MB/s
+			@type target_throughput: float | None
+			@param target_ratio: minimum ratio of uncompressed to compressed size
+			@type target_ratio: float | None
+			@param data_class: files of a data class share a choice, benchmarked once, the file extension if None
+			@type data_class: str | unicode | None
+
+			@return: compression type and level
+			@rtype: tuple[str, int]
+		"""
+		if target_throughput is None and target_ratio is None:
+			target_throughput = self._default_target_throughput
+		if data_class is None:
+			# extension of the decompressed file, like '.tsv' of 'a.tsv.gz'
+			filename, data_class = os.path.splitext(os.path.basename(file_path))
+			if data_class in self._file_extensions_compression:
+				data_class = os.path.splitext(filename)[1]
+			data_class = data_class.lower()
+		key = (data_class, target_throughput, target_ratio)
+		if key in self._auto_compression_cache:
+			return self._auto_compression_cache[key]
+
+		results = self.benchmark(file_path)
+		candidates = [
+			result for result in results
+			if (target_throughput is None or result["compression"] >= target_throughput) and
+			(target_ratio is None or result["ratio"] >= target_ratio)]
+		if target_ratio is not None and candidates:
+			best = max(candidates, key=lambda result: result["compression"])
+		elif candidates:
+			best = max(candidates, key=lambda result: result["ratio"])
+		elif target_throughput is not None:
+			best = max(results, key=lambda result: result["compression"])
+		else:
+			best = max(results, key=lambda result: result["ratio"])
+		choice = (best["compression_type"], best["level"])
+		self._logger.info("Chose compression {} level {} for '{}'".format(choice[0], choice[1], file_path))
+		self._auto_compression_cache[key] = choice
+		return choice
+
+	@staticmethod
+	def _copy_stream(read_handler, write_handler, chunk_size=1024 * 1024):
+		"""
+			Copy a binary stream in chunks, reusing one buffer
+
+			@param read_handler: file handler read from
+			@type read_handler: file | io.FileIO
+			@param write_handler: file handler written to
+			@type write_handler: file | gzip.GzipFile | bz2.BZ2File | ParallelGzipWriter
+			@param chunk_size: number of bytes copied at once
+			@type chunk_size: int
+
+			@return: number of bytes copied
+			@rtype: int | long
+		"""
+		buffer_data = bytearray(chunk_size)
+		buffer_view = memoryview(buffer_data)
+		size = 0
+		while True:
+			number_of_bytes = read_handler.readinto(buffer_data)
+			if not number_of_bytes:
+				break
+			write_handler.write(buffer_view[:number_of_bytes])
+			size += number_of_bytes
+		return size
 
 	def compress_list_of_files(
 		self, list_of_file_paths, dst, compresslevel=5,
@@ -176,6 +519,7 @@ class Compress(Validator):
 			Compress list of files
 
 			@attention: When reading file and compression_type None, type will be guessed.
+			With compression_type "auto", type and level are chosen once for all files, by benchmarking a sample of the first file.
 
 			@param list_of_file_paths: Path to file
 			@type list_of_file_paths: list[str|unicode]
@@ -183,7 +527,7 @@ class Compress(Validator):
 			@type dst: str | unicode
 			@param compresslevel: Higher level is slower but likely better. 0-9, except zip 0-8.
 			@type compresslevel: int
-			@param compression_type: "zip", "gz", "bz2",
+			@param compression_type: "zip", "gz", "bz2", "auto"
 			@type compression_type: str | unicode
 			@param overwrite: If false, a path will renamed if not available
 			@type overwrite: bool
@@ -194,15 +538,17 @@ class Compress(Validator):
 			@rtype: None
 		"""
 		assert self.validate_dir(dst), "Bad destination: '{}'".format(dst)
-		task_list = []
 		for file_path in list_of_file_paths:
-			if self.validate_file(file_path):
-				args = (file_path, dst, compresslevel, compression_type, overwrite)
-				task_list.append(TaskThread(_compress_file, args))
-			else:
+			if not self.validate_file(file_path):
 				msg = "File not found '{}'".format(file_path)
 				self._logger.error(msg)
 				raise IOError(msg)
+		if compression_type == "auto" and len(list_of_file_paths) > 0:
+			compression_type, compresslevel = self.choose_compression(list_of_file_paths[0])
+		task_list = []
+		for file_path in list_of_file_paths:
+			args = (file_path, dst, compresslevel, compression_type, overwrite)
+			task_list.append(TaskThread(_compress_file, args))
 		list_of_return_values = runThreadParallel(task_list, maxThreads=max_processors)
 		for index, return_value in enumerate(list_of_return_values):
 			assert return_value is None, "Compressing of '{}' failed. '{}'".format(list_of_file_paths[index], return_value)
@@ -214,12 +560,13 @@ class Compress(Validator):
 			Compress list of files
 
 			@attention: When reading file and compression_type None, type will be guessed.
+			With compression_type "auto", type and level are chosen once for all files, by benchmarking a sample of the first file.
 
 			@param list_of_tuples: Path to file and destination folder
 			@type list_of_tuples: list[tuple[str|unicode, str|unicode]]
 			@param compresslevel: Higher level is slower but likely better. 0-9, except zip 0-8.
 			@type compresslevel: int
-			@param compression_type: "zip", "gz", "bz2",
+			@param compression_type: "zip", "gz", "bz2", "auto"
 			@type compression_type: str | unicode
 			@param overwrite: If false, a path will renamed if not available
 			@type overwrite: bool
@@ -229,21 +576,79 @@ class Compress(Validator):
 			@return: True if stream
 			@rtype: None
 		"""
-		task_list = []
 		for file_path, dst in list_of_tuples:
 			assert self.validate_dir(dst), "Bad destination: '{}', must be folder.".format(dst)
-			if self.validate_file(file_path):
-				args = (file_path, dst, compresslevel, compression_type, overwrite)
-				task_list.append(TaskThread(_compress_file, args))
-			else:
+			if not self.validate_file(file_path):
 				msg = "File not found '{}'".format(file_path)
 				self._logger.error(msg)
 				raise IOError(msg)
+		if compression_type == "auto" and len(list_of_tuples) > 0:
+			compression_type, compresslevel = self.choose_compression(list_of_tuples[0][0])
+		task_list = []
+		for file_path, dst in list_of_tuples:
+			args = (file_path, dst, compresslevel, compression_type, overwrite)
+			task_list.append(TaskThread(_compress_file, args))
 		list_of_return_values = runThreadParallel(task_list, maxThreads=max_processors)
 		for index, return_value in enumerate(list_of_return_values):
 			assert return_value is None, "Compressing of '{}' failed. '{}'".format(list_of_tuples[index][0], return_value)
 
 
+for _codec in get_default_codecs():
+	Compress.register_codec(_codec)
+
+
+def _benchmark_codec(compression_type, compresslevel, sample_path):
+	"""
+		Compress and decompress a sample with a codec
+
+		@param compression_type: compression type
+		@type compression_type: str | unicode
+		@param compresslevel: compression level
+		@type compresslevel: int
+		@param sample_path: Path to an uncompressed sample
+		@type sample_path: str | unicode
+
+		@return: compression_type, level, compression and decompression MB/s, ratio and memory in bytes, or an error message
+		@rtype: dict[str, str|int|float] | str
+	"""
+	try:
+		return _measure_codec(compression_type, compresslevel, sample_path)
+	except Exception as e:
+		# an exception raised in a pool process with maxtasksperchild set blocks the pool
+		return "{}: {}".format(type(e).__name__, e)
+
+
+def _measure_codec(compression_type, compresslevel, sample_path):
+	codec = Compress._codecs[compression_type]
+	compressed_path = sample_path + "." + compression_type
+	size = os.path.getsize(sample_path)
+	memory_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+	time_start = time.time()
+	with open(sample_path, 'rb') as read_handler, codec.open(compressed_path, 'w', compresslevel) as write_handler:
+		Compress._copy_stream(read_handler, write_handler)
+	time_compression = max(time.time() - time_start, 1e-6)
+
+	time_start = time.time()
+	with codec.open(compressed_path, 'r') as read_handler:
+		while read_handler.read(1024 * 1024):
+			pass
+	time_decompression = max(time.time() - time_start, 1e-6)
+
+	memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - memory_start
+	compressed_size = os.path.getsize(compressed_path)
+	os.remove(compressed_path)
+	return {
+		"compression_type": compression_type,
+		"level": compresslevel,
+		"compression": size / 1024. / 1024. / time_compression,
+		"decompression": size / 1024. / 1024. / time_decompression,
+		"ratio": float(size) / max(compressed_size, 1),
+		# kilobytes on linux
+		"memory": memory * 1024,
+		}
+
+
 def _compress_file(src, dst='./', compresslevel=5, compression_type=None, overwrite=False):
 	# TODO: make this unnecessary
 	# workaround since pickling a method is a pain
@@ -251,6 +656,7 @@ def _compress_file(src, dst='./', compresslevel=5, compression_type=None, overwr
 		Compress a file
 
 		@attention: When reading file and compression_type None, type will be guessed.
+		Callers compressing files in parallel choose compression type "auto" before, instead of benchmarking per file.
 
 		@param src: Path to file
 		@type src: str | unicode
@@ -258,7 +664,7 @@ def _compress_file(src, dst='./', compresslevel=5, compression_type=None, overwr
 		@type dst: str | unicode
 		@param compresslevel: Higher level is slower but likely smaller. 0-9, except zip 0-8.
 		@type compresslevel: int
-		@param compression_type: "zip", "gz", "bz2",
+		@param compression_type: "zip", "gz", "bz2", "auto"
 		@type compression_type: str | unicode
 		@param overwrite: If false, a path will renamed if not available
 		@type overwrite: bool
@@ -267,7 +673,7 @@ def _compress_file(src, dst='./', compresslevel=5, compression_type=None, overwr
 		@rtype: None
 	"""
 	try:
-		compressor = Compress(compression_type)
+		compressor = Compress()
 		compressor.compress_file(src, dst, compresslevel, compression_type, overwrite)
 	except AssertionError as e:
 		return e.message
@@ -0,0 +1,270 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import os
+import json
+import zlib
+import bisect
+from scripts.Archive.stream import ChunkReader, iter_decompressed_chunks
+
+
+def _new_decompressor():
+	return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+class GzipIndex(object):
+	"""Access points of a gzip file, where decompression can start"""
+
+	_version = 1
+	_read_size = 1024 * 1024
+
+	def __init__(self, index_path):
+		"""
+			Sidecar file of access points at gzip member starts, with their uncompressed offset and line number
+
+			@attention: Decompression can only start at the start of a member, since zlib of Python 2 can not prime
+			a window. Files of a single member have only one access point, files written with a ParallelGzipWriter
+			have one per block.
+
+			@param index_path: path to index file
+			@type index_path: str | unicode
+
+			@return: None
+			@rtype: None
+		"""
+		self._index_path = index_path
+		# compressed offset, uncompressed offset, number of the first line starting at or after it, True if at a line start
+		self.list_of_points = [(0, 0, 0, True)]
+		self.number_of_lines = 0
+		self.size = 0
+		self._spacing = None
+
+	@staticmethod
+	def get_index_path(file_path):
+		"""
+			Get path of the index of a gzip file
+
+			@param file_path: path to gzip file
+			@type file_path: str | unicode
+
+			@return: path to index file
+			@rtype: str | unicode
+		"""
+		return file_path + ".gzi"
+
+	@staticmethod
+	def _get_source_state(source_path, spacing):
+		stat = os.stat(source_path)
+		return {
+			"source_mtime": stat.st_mtime,
+			"source_size": stat.st_size,
+			"spacing": spacing,
+			}
+
+	def is_valid(self, source_path, spacing=None):
+		"""
+			Test if the index was built from the current state of a file
+
+			@param source_path: path to gzip file
+			@type source_path: str | unicode
+			@param spacing: minimum number of uncompressed bytes between access points, any if None
+			@type spacing: int | None
+
+			@return: True if index can be used
+			@rtype: bool
+		"""
+		if not os.path.isfile(self._index_path):
+			return False
+		try:
+			with open(self._index_path) as file_handler:
+				header = json.load(file_handler)
+		except ValueError:
+			return False
+		state = self._get_source_state(source_path, header.get("spacing") if spacing is None else spacing)
+		if header.get("version") != self._version:
+			return False
+		return all(header.get(key) == value for key, value in state.iteritems())
+
+	def build(self, source_path, spacing):
+		"""
+			Decompress a gzip file once, recording access points at member starts
+
+			@param source_path: path to gzip file
+			@type source_path: str | unicode
+			@param spacing: minimum number of uncompressed bytes between access points
+			@type spacing: int
+
+			@return: Nothing
+			@rtype: None
+		"""
+		for _ in self.iter_build(source_path, spacing):
+			pass
+
+	def iter_build(self, source_path, spacing):
+		"""
+			Decompress a gzip file once, recording access points at member starts while passing on the data
+
+			@attention: The index is complete once the generator is exhausted
+
+			@param source_path: path to gzip file
+			@type source_path: str | unicode
+			@param spacing: minimum number of uncompressed bytes between access points
+			@type spacing: int
+
+			@return: Generator of decompressed data
+			@rtype: generator[str]
+		"""
+		list_of_points = [(0, 0, 0, True)]
+		compressed_offset = 0
+		uncompressed_offset = 0
+		number_of_newlines = 0
+		is_line_start = True
+		is_member_start = False
+		decompressor = _new_decompressor()
+		with open(source_path, 'rb') as file_handler:
+			while True:
+				data = file_handler.read(self._read_size)
+				if not data:
+					break
+				while data:
+					if is_member_start and uncompressed_offset - list_of_points[-1][1] >= spacing:
+						first_line = number_of_newlines if is_line_start else number_of_newlines + 1
+						list_of_points.append((compressed_offset, uncompressed_offset, first_line, is_line_start))
+					is_member_start = False
+					chunk = decompressor.decompress(data)
+					if chunk:
+						uncompressed_offset += len(chunk)
+						number_of_newlines += chunk.count('\n')
+						is_line_start = chunk[-1] == '\n'
+						yield chunk
+					unused_data = decompressor.unused_data
+					compressed_offset += len(data) - len(unused_data)
+					data = unused_data
+					if data:
+						decompressor = _new_decompressor()
+						is_member_start = True
+		self.list_of_points = list_of_points
+		self.number_of_lines = number_of_newlines if is_line_start else number_of_newlines + 1
+		self.size = uncompressed_offset
+		self._spacing = spacing
+
+	def to_dict(self):
+		"""
+			Get the access points for serialisation
+
+			@return: access points, number of lines, size and spacing
+			@rtype: dict
+		"""
+		return {
+			"number_of_lines": self.number_of_lines,
+			"size": self.size,
+			"spacing": self._spacing,
+			"points": self.list_of_points,
+			}
+
+	def update(self, header):
+		"""
+			Set the access points from a serialised index
+
+			@param header: dictionary returned by to_dict
+			@type header: dict
+
+			@return: Nothing
+			@rtype: None
+		"""
+		self.list_of_points = [tuple(point) for point in header["points"]]
+		self.number_of_lines = header["number_of_lines"]
+		self.size = header["size"]
+		self._spacing = header["spacing"]
+
+	def save(self, source_path):
+		"""
+			Write the index next to the gzip file
+
+			@param source_path: path to gzip file the index was built of
+			@type source_path: str | unicode
+
+			@return: Nothing
+			@rtype: None
+		"""
+		header = self._get_source_state(source_path, self._spacing)
+		header["version"] = self._version
+		header.update(self.to_dict())
+		with open(self._index_path, 'w') as file_handler:
+			json.dump(header, file_handler)
+
+	def load(self):
+		"""
+			Read the index
+
+			@return: Nothing
+			@rtype: None
+		"""
+		with open(self._index_path) as file_handler:
+			self.update(json.load(file_handler))
+
+	def get_point_of_line(self, line_number):
+		"""
+			Get the last access point before a line
+
+			@param line_number: number of line, starting at 0
+			@type line_number: int
+
+			@return: access point
+			@rtype: tuple
+		"""
+		list_of_first_lines = [point[2] for point in self.list_of_points]
+		return self.list_of_points[max(bisect.bisect_right(list_of_first_lines, line_number) - 1, 0)]
+
+	def get_point_of_offset(self, offset):
+		"""
+			Get the last access point at or before an uncompressed offset
+
+			@param offset: uncompressed offset
+			@type offset: int
+
+			@return: access point
+			@rtype: tuple
+		"""
+		list_of_offsets = [point[1] for point in self.list_of_points]
+		return self.list_of_points[max(bisect.bisect_right(list_of_offsets, offset) - 1, 0)]
+
+	@staticmethod
+	def iter_chunks(source_path, point):
+		"""
+			Decompress a gzip file starting at an access point
+
+			@param source_path: path to gzip file
+			@type source_path: str | unicode
+			@param point: access point
+			@type point: tuple
+
+			@return: Generator of decompressed data
+			@rtype: generator[str]
+		"""
+		with open(source_path, 'rb') as file_handler:
+			file_handler.seek(point[0])
+			for chunk in iter_decompressed_chunks(file_handler, _new_decompressor):
+				yield chunk
+
+	def iter_lines(self, source_path, point):
+		"""
+			Read lines of a gzip file starting at the first line after an access point
+
+			@param source_path: path to gzip file
+			@type source_path: str | unicode
+			@param point: access point
+			@type point: tuple
+
+			@return: Generator of lines, starting with line number point[2]
+			@rtype: generator[str]
+		"""
+		reader = ChunkReader(self.iter_chunks(source_path, point))
+		try:
+			if not point[3]:
+				# rest of a line starting before the access point
+				reader.readline()
+			for line in reader:
+				yield line
+		finally:
+			reader.close()
@@ -0,0 +1,125 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import zlib
+import collections
+from multiprocessing.pool import ThreadPool
+
+
+def _compress_block(data, compresslevel):
+	"""
+		Compress a block of data into a complete gzip member
+
+		@param data: uncompressed data
+		@type data: str
+		@param compresslevel: 0-9
+		@type compresslevel: int
+
+		@return: gzip member
+		@rtype: str
+	"""
+	compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+	return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipWriter(object):
+	"""Write a gzip file by compressing blocks of data simultaneously"""
+
+	def __init__(self, file_path, mode='w', compresslevel=5, max_processors=2, block_size=1024 * 1024):
+		"""
+			Compress blocks of written data as independent gzip members in a pool of threads
+
+			@attention: The members are concatenated in order, which is a valid gzip file.
+			zlib releases the GIL while compressing, so threads run on separate cores.
+
+			@param file_path: Path to file
+			@type file_path: str | unicode
+			@param mode: 'w' or 'a'
+			@type mode: str | unicode
+			@param compresslevel: Higher level is slower but likely smaller. 0-9
+			@type compresslevel: int
+			@param max_processors: Number of threads compressing blocks
+			@type max_processors: int
+			@param block_size: number of uncompressed bytes per gzip member
+			@type block_size: int
+
+			@return: None
+			@rtype: None
+		"""
+		assert mode in ('w', 'a')
+		self._file_handler = open(file_path, mode + 'b')
+		self._compresslevel = compresslevel
+		self._block_size = block_size
+		self._max_pending = 2 * max_processors
+		self._pool = ThreadPool(max_processors)
+		self._pending = collections.deque()
+		self._buffer = []
+		self._buffer_size = 0
+		self.closed = False
+
+	def _submit(self):
+		if self._buffer_size == 0:
+			return
+		data = ''.join(self._buffer)
+		self._buffer = []
+		self._buffer_size = 0
+		self._pending.append(self._pool.apply_async(_compress_block, (data, self._compresslevel)))
+		while len(self._pending) > self._max_pending:
+			self._file_handler.write(self._pending.popleft().get())
+
+	def write(self, data):
+		"""
+			Write data
+
+			@param data: data
+			@type data: str | memoryview
+
+			@return: Nothing
+			@rtype: None
+		"""
+		assert not self.closed, "I/O operation on closed file"
+		if isinstance(data, memoryview):
+			# the memory of a view can be reused by the caller
+			data = data.tobytes()
+		self._buffer.append(data)
+		self._buffer_size += len(data)
+		if self._buffer_size >= self._block_size:
+			self._submit()
+
+	def writelines(self, lines):
+		for line in lines:
+			self.write(line)
+
+	def flush(self):
+		"""
+			Compress buffered data and write all pending members
+
+			@return: Nothing
+			@rtype: None
+		"""
+		self._submit()
+		while self._pending:
+			self._file_handler.write(self._pending.popleft().get())
+		self._file_handler.flush()
+
+	def close(self):
+		"""
+			Write remaining data and close the file
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if self.closed:
+			return
+		try:
+			self.flush()
+		finally:
+			self.closed = True
+			self._pool.terminate()
+			self._file_handler.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exception_type, value, traceback):
+		self.close()
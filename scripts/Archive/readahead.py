@@ -0,0 +1,229 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import re
+import sys
+import bz2
+import mmap
+import threading
+import Queue
+import collections
+from itertools import islice
+from multiprocessing.pool import ThreadPool
+from scripts.Archive.stream import ChunkReader, iter_decompressed_file
+
+
+_bz2_stream_header = re.compile(r"BZh[1-9]1AY&SY")
+
+
+def iter_file_chunks(file_handler, buffer_size=1024 * 1024):
+	"""
+		Read a file in chunks
+
+		@param file_handler: file handler, closed when all is read
+		@type file_handler: file | gzip.GzipFile | bz2.BZ2File
+		@param buffer_size: number of bytes per chunk
+		@type buffer_size: int
+
+		@return: Generator of chunks
+		@rtype: generator[str]
+	"""
+	try:
+		while True:
+			data = file_handler.read(buffer_size)
+			if not data:
+				break
+			yield data
+	finally:
+		file_handler.close()
+
+
+def _read_range(file_path, start, end):
+	with open(file_path, 'rb') as file_handler:
+		file_handler.seek(start)
+		return file_handler.read(end - start)
+
+
+def _decompress_bz2_streams(data):
+	"""
+		Decompress concatenated bz2 streams
+
+		@param data: complete bz2 streams
+		@type data: str
+
+		@return: decompressed data, None if the data does not end with the end of a stream
+		@rtype: str | None
+	"""
+	list_of_chunks = []
+	while data:
+		decompressor = bz2.BZ2Decompressor()
+		try:
+			list_of_chunks.append(decompressor.decompress(data))
+			decompressor.decompress('')
+		except EOFError:
+			# end of stream reached
+			data = decompressor.unused_data
+			continue
+		except IOError:
+			return None
+		return None
+	return ''.join(list_of_chunks)
+
+
+def _decompress_bz2_range(file_path, start, end):
+	return _decompress_bz2_streams(_read_range(file_path, start, end))
+
+
+def get_bz2_stream_offsets(file_path):
+	"""
+		Get offsets of candidate stream headers of a multi-stream bz2 file
+
+		@attention: A header pattern can occur inside compressed data, decompressed ranges need to be verified
+
+		@param file_path: Path to file
+		@type file_path: str | unicode
+
+		@return: offsets of stream starts, ending with the file size
+		@rtype: list[int]
+	"""
+	with open(file_path, 'rb') as file_handler:
+		mapped = mmap.mmap(file_handler.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			list_of_offsets = [match.start() for match in _bz2_stream_header.finditer(mapped)]
+			size = len(mapped)
+		finally:
+			mapped.close()
+	if not list_of_offsets or list_of_offsets[0] != 0:
+		list_of_offsets.insert(0, 0)
+	list_of_offsets.append(size)
+	return list_of_offsets
+
+
+def _iter_slices(data, buffer_size):
+	for offset in xrange(0, len(data), buffer_size):
+		yield data[offset:offset + buffer_size]
+
+
+def iter_bz2_streams(file_path, max_processors=2, buffer_size=1024 * 1024):
+	"""
+		Decompress the streams of a multi-stream bz2 file simultaneously
+
+		@attention: Ranges cut at a false stream header are merged with the following range and decompressed again.
+		At most max_processors streams are decompressed ahead, each held in memory as a whole.
+		Files of a single stream are decompressed incrementally in the calling thread.
+
+		@param file_path: Path to file
+		@type file_path: str | unicode
+		@param max_processors: Number of threads decompressing streams
+		@type max_processors: int
+		@param buffer_size: maximum number of bytes per chunk of decompressed data
+		@type buffer_size: int
+
+		@return: Generator of decompressed data in order of the file
+		@rtype: generator[str]
+
+		@raises: IOError
+	"""
+	list_of_offsets = get_bz2_stream_offsets(file_path)
+	if len(list_of_offsets) <= 2:
+		for data in iter_decompressed_file(file_path, bz2.BZ2Decompressor, buffer_size):
+			yield data
+		return
+	list_of_ranges = iter(zip(list_of_offsets[:-1], list_of_offsets[1:]))
+	pool = ThreadPool(max_processors)
+	try:
+		pending = collections.deque()
+		pending_start = None
+		while True:
+			for start, end in islice(list_of_ranges, max_processors - len(pending)):
+				pending.append(((start, end), pool.apply_async(_decompress_bz2_range, (file_path, start, end))))
+			if not pending:
+				break
+			(start, end), result = pending.popleft()
+			data = result.get()
+			if pending_start is None and data is not None:
+				for chunk in _iter_slices(data, buffer_size):
+					yield chunk
+				continue
+			if pending_start is None:
+				pending_start = start
+			data = _decompress_bz2_range(file_path, pending_start, end)
+			if data is not None:
+				pending_start = None
+				for chunk in _iter_slices(data, buffer_size):
+					yield chunk
+		if pending_start is not None:
+			raise IOError("Invalid bz2 data in '{}' at byte {}".format(file_path, pending_start))
+	finally:
+		pool.terminate()
+
+
+class ReadAheadReader(ChunkReader):
+	"""File-like reader of data produced in a separate thread"""
+
+	def __init__(self, chunks, max_queue_size=8):
+		"""
+			Consume an iterator of data in a thread, passing chunks through a bounded queue
+
+			@attention: Lets decompression and parsing overlap
+
+			@param chunks: iterator of data
+			@type chunks: iterator[str]
+			@param max_queue_size: maximum number of chunks read ahead
+			@type max_queue_size: int
+
+			@return: None
+			@rtype: None
+		"""
+		super(ReadAheadReader, self).__init__(chunks)
+		self._queue = Queue.Queue(maxsize=max_queue_size)
+		self._stop = threading.Event()
+		self._exception_info = None
+		self._thread = threading.Thread(target=self._run)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def _run(self):
+		try:
+			for data in self._chunks:
+				while not self._stop.is_set():
+					try:
+						self._queue.put(data, timeout=0.1)
+						break
+					except Queue.Full:
+						continue
+				if self._stop.is_set():
+					break
+		except Exception:
+			self._exception_info = sys.exc_info()
+		finally:
+			if hasattr(self._chunks, "close"):
+				self._chunks.close()
+			self._queue.put(None)
+
+	def _get_chunk(self):
+		data = self._queue.get()
+		if data is None and self._exception_info is not None:
+			self._eof = True
+			exception_type, exception, traceback = self._exception_info
+			self._exception_info = None
+			raise exception_type, exception, traceback
+		return data
+
+	def close(self):
+		"""
+			Stop reading ahead
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if self.closed:
+			return
+		self.closed = True
+		self._stop.set()
+		while self._thread.is_alive():
+			try:
+				self._queue.get(timeout=0.1)
+			except Queue.Empty:
+				pass
+		self._thread.join()
@@ -0,0 +1,213 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+
+class ChunkReader(object):
+	"""File-like reader of data produced in chunks"""
+
+	def __init__(self, chunks):
+		"""
+			Read an iterator of data like a file
+
+			@param chunks: iterator of data
+			@type chunks: iterator[str]
+
+			@return: None
+			@rtype: None
+		"""
+		self._chunks = chunks
+		self._buffer = ''
+		self._position = 0
+		self._eof = False
+		self.closed = False
+
+	def _get_chunk(self):
+		"""
+			Get the next chunk of data
+
+			@return: data, None at the end
+			@rtype: str | None
+		"""
+		return next(self._chunks, None)
+
+	def _next_chunk(self):
+		if self._eof:
+			return False
+		data = self._get_chunk()
+		if data is None:
+			self._eof = True
+			return False
+		self._buffer = self._buffer[self._position:] + data
+		self._position = 0
+		return True
+
+	def read(self, size=-1):
+		"""
+			Read data
+
+			@param size: maximum number of bytes, all remaining data if negative
+			@type size: int
+
+			@return: data, empty at the end
+			@rtype: str
+		"""
+		assert not self.closed, "I/O operation on closed file"
+		if size < 0:
+			while self._next_chunk():
+				pass
+		elif self._position == len(self._buffer):
+			self._next_chunk()
+		end = len(self._buffer)
+		if 0 <= size < end - self._position:
+			end = self._position + size
+		data = self._buffer[self._position:end]
+		self._position = end
+		return data
+
+	def readline(self):
+		"""
+			Read a line
+
+			@return: line including line break, empty at the end
+			@rtype: str
+		"""
+		assert not self.closed, "I/O operation on closed file"
+		position = self._buffer.find('\n', self._position)
+		while position < 0:
+			searched = len(self._buffer) - self._position
+			if not self._next_chunk():
+				break
+			position = self._buffer.find('\n', searched)
+		end = len(self._buffer) if position < 0 else position + 1
+		line = self._buffer[self._position:end]
+		self._position = end
+		return line
+
+	def __iter__(self):
+		return iter(self.readline, '')
+
+	def close(self):
+		"""
+			Stop reading
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if self.closed:
+			return
+		self.closed = True
+		if hasattr(self._chunks, "close"):
+			self._chunks.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exception_type, value, traceback):
+		self.close()
+
+
+class PeekableStream(ChunkReader):
+	"""Stream allowing to look at data before reading it"""
+
+	def __init__(self, stream, buffer_size=1024 * 1024):
+		"""
+			Wrap a stream, which does not need to be seekable
+
+			@param stream: stream, not closed with the wrapper
+			@type stream: file | io.FileIO | StringIO.StringIO
+			@param buffer_size: number of bytes read from the stream at once
+			@type buffer_size: int
+
+			@return: None
+			@rtype: None
+		"""
+		super(PeekableStream, self).__init__(None)
+		self._stream = stream
+		self._buffer_size = buffer_size
+
+	def _get_chunk(self):
+		return self._stream.read(self._buffer_size) or None
+
+	def peek(self, size):
+		"""
+			Get data without consuming it
+
+			@param size: number of bytes, fewer at the end of the stream
+			@type size: int
+
+			@return: data
+			@rtype: str
+		"""
+		assert not self.closed, "I/O operation on closed file"
+		while len(self._buffer) - self._position < size and self._next_chunk():
+			pass
+		return self._buffer[self._position:self._position + size]
+
+
+def iter_decompressed_chunks(stream, new_decompressor, buffer_size=1024 * 1024):
+	"""
+		Decompress a stream of concatenated compressed streams, like gzip members, without seeking
+
+		@attention: Zero bytes padding the end of a stream are skipped
+
+		@param stream: compressed stream
+		@type stream: file | PeekableStream
+		@param new_decompressor: returns a decompressor object with a decompress method
+		@type new_decompressor: () -> zlib.Decompress | bz2.BZ2Decompressor
+		@param buffer_size: number of compressed bytes read at once
+		@type buffer_size: int
+
+		@return: Generator of decompressed data
+		@rtype: generator[str]
+	"""
+	decompressor = new_decompressor()
+	is_between_streams = False
+	while True:
+		data = stream.read(buffer_size)
+		if not data:
+			break
+		while data:
+			if is_between_streams:
+				# like gzip, zero padding after a stream is skipped
+				data = data.lstrip('\0')
+				if not data:
+					break
+			try:
+				chunk = decompressor.decompress(data)
+			except EOFError:
+				# previous stream ended exactly at the end of the previous data
+				decompressor = new_decompressor()
+				is_between_streams = True
+				continue
+			is_between_streams = False
+			if chunk:
+				yield chunk
+			data = getattr(decompressor, "unused_data", '')
+			if data:
+				decompressor = new_decompressor()
+				is_between_streams = True
+	if hasattr(decompressor, "flush"):
+		chunk = decompressor.flush()
+		if chunk:
+			yield chunk
+
+
+def iter_decompressed_file(file_path, new_decompressor, buffer_size=1024 * 1024):
+	"""
+		Decompress all members or streams of a file in chunks
+
+		@attention: The file is closed when the generator is closed
+
+		@param file_path: Path to compressed file
+		@type file_path: str | unicode
+		@param new_decompressor: returns a decompressor object with a decompress method
+		@type new_decompressor: () -> zlib.Decompress | bz2.BZ2Decompressor
+		@param buffer_size: number of compressed bytes read at once
+		@type buffer_size: int
+
+		@return: Generator of decompressed data
+		@rtype: generator[str]
+	"""
+	with open(file_path, 'rb') as file_handler:
+		for data in iter_decompressed_chunks(file_handler, new_decompressor, buffer_size):
+			yield data
@@ -0,0 +1,202 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import os
+import mmap
+import json
+import array
+import struct
+from scripts.Table.column import Column
+
+
+class ColumnarCache(object):
+	"""Binary columnar sidecar file of a parsed table"""
+
+	_magic = "MDTC"
+	_version = 2
+	_header_format = "<4sIQ"
+	_offset_typecode = 'L'
+
+	def __init__(self, cache_path):
+		"""
+			Binary columnar file storing column names, row count, column data and a dictionary-encoded string pool
+
+			@attention: Columns of mostly unique strings are stored as their end offsets and packed values
+
+			@param cache_path: path to cache file
+			@type cache_path: str | unicode
+
+			@return: None
+			@rtype: None
+		"""
+		self._cache_path = cache_path
+
+	@staticmethod
+	def _get_source_state(source_path, separator, column_names, comment_line):
+		"""
+			Get the state of a source file and the arguments it was parsed with
+
+			@return: state of source file
+			@rtype: dict
+		"""
+		stat = os.stat(source_path)
+		return {
+			"source_mtime": stat.st_mtime,
+			"source_size": stat.st_size,
+			"separator": separator,
+			"column_names": column_names,
+			"comment_line": sorted(comment_line),
+			}
+
+	def _read_header(self, file_handler):
+		"""
+			Read the description of the stored columns
+
+			@param file_handler: opened cache file
+			@type file_handler: file | mmap.mmap
+
+			@return: header and offset of column data, None if not a cache file
+			@rtype: tuple[dict, int] | None
+		"""
+		header_size = struct.calcsize(self._header_format)
+		magic, version, length = struct.unpack(self._header_format, file_handler.read(header_size) or '\0' * header_size)
+		if magic != self._magic or version != self._version:
+			return None
+		return json.loads(file_handler.read(length)), header_size + length
+
+	def is_valid(self, source_path, separator, column_names, comment_line):
+		"""
+			Test if the cache was created from the current state of a file parsed with the same arguments
+
+			@param source_path: path to source file
+			@type source_path: str | unicode
+			@param separator: character separating values in a row
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: list of character indicating comment lines
+			@type comment_line: list[str|unicode]
+
+			@return: True if cache can be used
+			@rtype: bool
+		"""
+		if not os.path.isfile(self._cache_path) or not os.path.isfile(source_path):
+			return False
+		try:
+			with open(self._cache_path, 'rb') as file_handler:
+				result = self._read_header(file_handler)
+		except (IOError, ValueError, struct.error):
+			return False
+		if result is None:
+			return False
+		header, data_offset = result
+		state = self._get_source_state(source_path, separator, column_names, comment_line)
+		for key, value in state.iteritems():
+			if header.get(key) != value:
+				return False
+		return True
+
+	def save(self, list_of_column_names, meta_table, number_of_rows, source_path, separator, column_names, comment_line):
+		"""
+			Write columns of a table to the cache file
+
+			@param list_of_column_names: column names or indexes
+			@type list_of_column_names: list[str|int]
+			@param meta_table: columns by name
+			@type meta_table: dict[str|int, Column]
+			@param number_of_rows: number of rows
+			@type number_of_rows: int
+			@param source_path: path to file the table was read from
+			@type source_path: str | unicode
+			@param separator: character separating values in a row
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: list of character indicating comment lines
+			@type comment_line: list[str|unicode]
+
+			@return: Nothing
+			@rtype: None
+
+			@raises: TypeError
+		"""
+		header = self._get_source_state(source_path, separator, column_names, comment_line)
+		header["number_of_rows"] = number_of_rows
+		header["columns"] = []
+		list_of_buffers = []
+		offset = 0
+		for column_name in list_of_column_names:
+			column = meta_table[column_name]
+			if not isinstance(column, Column):
+				column = Column(list(column))
+			column_type, data, pool = column.to_buffers()
+			description = {
+				"name": column_name,
+				"type": column_type,
+				"data": [offset, len(data)],
+				}
+			list_of_buffers.append(data)
+			offset += len(data)
+			if column_type == Column._type_packed:
+				description["pool"] = [offset, len(pool)]
+				list_of_buffers.append(pool)
+				offset += len(pool)
+			elif pool is not None:
+				pool_offsets = array.array(self._offset_typecode, [0])
+				for value in pool:
+					pool_offsets.append(pool_offsets[-1] + len(value))
+				pool_offsets = pool_offsets.tostring()
+				description["pool_offsets"] = [offset, len(pool_offsets)]
+				list_of_buffers.append(pool_offsets)
+				offset += len(pool_offsets)
+				pool_data = "".join(pool)
+				description["pool"] = [offset, len(pool_data)]
+				list_of_buffers.append(pool_data)
+				offset += len(pool_data)
+			header["columns"].append(description)
+
+		header = json.dumps(header)
+		with open(self._cache_path, 'wb') as file_handler:
+			file_handler.write(struct.pack(self._header_format, self._magic, self._version, len(header)))
+			file_handler.write(header)
+			for data in list_of_buffers:
+				file_handler.write(data)
+
+	def load(self):
+		"""
+			Read columns of a table from the cache file
+
+			@return: column names or indexes, columns by name, number of rows
+			@rtype: tuple[list[str|int], dict[str|int, Column], int]
+		"""
+		list_of_column_names = []
+		meta_table = {}
+		with open(self._cache_path, 'rb') as file_handler:
+			data = mmap.mmap(file_handler.fileno(), 0, access=mmap.ACCESS_READ)
+		try:
+			header, data_offset = self._read_header(data)
+			for description in header["columns"]:
+				column_name = description["name"]
+				if isinstance(column_name, unicode):
+					column_name = column_name.encode('utf-8')
+				pool = None
+				if "pool" in description and "pool_offsets" not in description:
+					start, length = description["pool"]
+					pool = data[data_offset + start:data_offset + start + length]
+				elif "pool" in description:
+					start, length = description["pool_offsets"]
+					pool_offsets = array.array(self._offset_typecode)
+					pool_offsets.fromstring(data[data_offset + start:data_offset + start + length])
+					start, length = description["pool"]
+					pool_data = data[data_offset + start:data_offset + start + length]
+					pool = [pool_data[pool_offsets[index]:pool_offsets[index + 1]] for index in xrange(len(pool_offsets) - 1)]
+				start, length = description["data"]
+				column_type = description["type"]
+				if column_type is not None:
+					column_type = str(column_type)
+				column = Column.from_buffers(column_type, data[data_offset + start:data_offset + start + length], pool)
+				list_of_column_names.append(column_name)
+				meta_table[column_name] = column
+		finally:
+			data.close()
+		return list_of_column_names, meta_table, header["number_of_rows"]
@@ -0,0 +1,754 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import json
+import array
+from bisect import bisect_right
+from itertools import imap, izip, chain
+
+
+def to_number(value):
+	"""
+		Convert a cell value to a number
+
+		@param value: cell value
+		@type value: str | unicode
+
+		@return: number
+		@rtype: int | long | float
+
+		@raises: ValueError
+	"""
+	try:
+		return int(value)
+	except ValueError:
+		return float(value)
+
+
+class Column(object):
+	"""Compact storage of the cell values of a table column"""
+
+	_type_integer = "int"
+	_type_float = "float"
+	_type_string = "str"
+	_type_packed = "packed"
+	_type_object = "object"
+
+	_typecode = {
+		_type_integer: 'l',
+		_type_float: 'd',
+		_type_string: 'I',
+		_type_packed: 'L',
+		}
+
+	# dictionary encoding is dropped for columns with mostly unique values
+	_minimum_pool_size = 4096
+	_maximum_pool_ratio = 0.5
+	# number of values of a packed column decoded at once while iterating
+	_packed_block_size = 65536
+	# number of values the type of a column is inferred from
+	_sample_size = 1024
+
+	def __init__(self, list_of_values=None):
+		"""
+			Column of cell values stored by inferred type
+
+			@attention: Integer and float columns are stored in arrays, string columns dictionary-encoded.
+			Strings of columns with mostly unique values are packed into one buffer, with an array of their end offsets.
+			Values that can not be restored to the exact same string demote a column to a more general type.
+
+			@param list_of_values: Cell values of a column
+			@type list_of_values: None | list[str|unicode]
+
+			@return: None
+			@rtype: None
+		"""
+		self._type = None
+		self._data = []
+		self._pool = None
+		self._lookup = None
+		self._buffer = None
+		self._has_line_breaks = False
+		if list_of_values:
+			self.extend(list_of_values)
+
+	@staticmethod
+	def _infer_type(value):
+		"""
+			Get the most compact type able to restore a value
+
+			@param value: cell value
+			@type value: str | unicode | object
+
+			@return: column type
+			@rtype: str
+		"""
+		if not isinstance(value, basestring):
+			return Column._type_object
+		try:
+			if str(int(value)) == value:
+				return Column._type_integer
+		except (ValueError, OverflowError):
+			pass
+		try:
+			if repr(float(value)) == value:
+				return Column._type_float
+		except ValueError:
+			pass
+		return Column._type_string
+
+	@staticmethod
+	def _infer_sample_type(list_of_values):
+		"""
+			Get the most compact type able to restore each value of a sample
+
+			@param list_of_values: sample of cell values
+			@type list_of_values: list[str|unicode|object]
+
+			@return: column type
+			@rtype: str
+		"""
+		set_of_types = set(imap(Column._infer_type, list_of_values))
+		if len(set_of_types) == 1:
+			return set_of_types.pop()
+		if Column._type_object in set_of_types:
+			return Column._type_object
+		# an integer is not restored from a float and vice versa
+		return Column._type_string
+
+	def get_type(self):
+		"""
+			Get the type cell values are stored as
+
+			@return: 'int', 'float', 'str', 'packed', 'object' or None if empty
+			@rtype: None | str
+		"""
+		return self._type
+
+	def _set_type(self, column_type, list_of_values=None):
+		"""
+			Reset the storage to a type and refill it
+
+			@param column_type: 'int', 'float', 'str', 'packed' or 'object'
+			@type column_type: str
+			@param list_of_values: Cell values to be stored
+			@type list_of_values: None | list[str|unicode]
+
+			@return: Nothing
+			@rtype: None
+		"""
+		self._type = column_type
+		self._pool = None
+		self._lookup = None
+		self._buffer = None
+		self._has_line_breaks = False
+		if column_type == self._type_object:
+			self._data = list_of_values or []
+			return
+		self._data = array.array(self._typecode[column_type])
+		if column_type == self._type_string:
+			self._pool = []
+			self._lookup = {}
+		elif column_type == self._type_packed:
+			self._buffer = bytearray()
+		if list_of_values:
+			self.extend(list_of_values)
+
+	def _demote(self, value):
+		"""
+			Change to a type able to store the current values and a new value
+
+			@param value: cell value that can not be stored with the current type
+			@type value: str | unicode | object
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if self._type in (self._type_integer, self._type_float) and isinstance(value, basestring):
+			self._set_type(self._type_string, list(self))
+		else:
+			self._set_type(self._type_object, list(self))
+
+	def has_strings(self):
+		"""
+			Test if cell values are returned as strings
+
+			@return: False for object columns, their values can be of any type
+			@rtype: bool
+		"""
+		return self._type != self._type_object
+
+	def append(self, value):
+		"""
+			Add a value at the end of the column
+
+			@param value: cell value
+			@type value: str | unicode
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if self._type is None:
+			self._set_type(self._infer_type(value))
+
+		if self._type == self._type_object:
+			self._data.append(value)
+		elif self._type == self._type_string:
+			if not isinstance(value, basestring):
+				self._demote(value)
+				self.append(value)
+				return
+			code = self._lookup.get(value)
+			if code is None:
+				code = self._add_to_pool(value)
+			self._data.append(code)
+			self._validate_pool_size()
+		elif self._type == self._type_packed:
+			if not isinstance(value, str):
+				self._demote(value)
+				self.append(value)
+				return
+			if '\n' in value:
+				self._has_line_breaks = True
+			self._buffer.extend(value)
+			self._buffer.extend('\n')
+			self._data.append(len(self._buffer))
+		else:
+			try:
+				if self._type == self._type_integer:
+					number = int(value)
+					is_exact = str(number) == value
+				else:
+					number = float(value)
+					is_exact = repr(number) == value
+				if is_exact:
+					self._data.append(number)
+					return
+			except (ValueError, TypeError, OverflowError):
+				pass
+			self._demote(value)
+			self.append(value)
+
+	def extend(self, list_of_values):
+		"""
+			Add values at the end of the column
+
+			@param list_of_values: Cell values
+			@type list_of_values: list[str|unicode]
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if not isinstance(list_of_values, list):
+			list_of_values = list(list_of_values)
+		if len(list_of_values) == 0:
+			return
+		if self._type is None:
+			self._set_type(self._infer_sample_type(list_of_values[:self._sample_size]))
+
+		if self._type == self._type_object:
+			self._data.extend(list_of_values)
+			return
+		if self._type == self._type_string:
+			self._extend_string(list_of_values)
+			return
+		if self._type == self._type_packed:
+			self._extend_packed(list_of_values)
+			return
+		numbers = self._to_numbers(list_of_values)
+		if numbers is not None:
+			self._data.extend(numbers)
+			return
+		# at least one value can not be restored from a number
+		self._set_type(self._type_string, list(self))
+		self._extend_string(list_of_values)
+
+	def _to_numbers(self, list_of_values):
+		"""
+			Convert values to numbers of the column type, if each value is restored exactly
+
+			@attention: Values are parsed and written back as a single JSON list, which is done in C.
+			Values JSON does not know, like 'nan' or 'inf', are converted one by one.
+
+			@param list_of_values: Cell values
+			@type list_of_values: list[str|unicode]
+
+			@return: numbers or None if a value can not be restored from its number
+			@rtype: array.array | None
+		"""
+		try:
+			text = ','.join(list_of_values)
+		except TypeError:
+			return None
+		if not isinstance(text, str):
+			return None
+		is_integer = self._type == self._type_integer
+		try:
+			if text.translate(None, '0123456789-,' if is_integer else '0123456789-.e+,') == '':
+				text = '[' + text + ']'
+				if is_integer:
+					numbers = json.loads(text)
+					is_exact = json.dumps(numbers, separators=(',', ':')) == text
+				else:
+					numbers = json.loads(text, parse_int=float)
+					is_exact = self._is_float_repr(list_of_values) or json.dumps(numbers, separators=(',', ':')) == text
+				# a comma within a value gives more numbers than values
+				is_exact = is_exact and len(numbers) == len(list_of_values)
+			elif is_integer:
+				return None
+			else:
+				numbers = map(float, list_of_values)
+				is_exact = map(repr, numbers) == list_of_values
+			if is_exact:
+				# converted separately, array.extend keeps the values before one out of the range of a C long
+				return array.array(self._data.typecode, numbers)
+		except (ValueError, OverflowError):
+			pass
+		return None
+
+	@staticmethod
+	def _is_float_repr(list_of_values):
+		"""
+			Test if values are written the way repr writes floats, without converting them
+
+			@attention: Only values in positional notation with at most 15 significant digits are recognised,
+			which any double restores exactly. False does not mean the values can not be restored.
+
+			@param list_of_values: Cell values
+			@type list_of_values: list[str|unicode]
+
+			@return: True if each value is the repr of its float
+			@rtype: bool
+		"""
+		# 15 digits and a decimal point
+		if max(imap(len, list_of_values)) > 16:
+			return False
+		block = '\n' + '\n'.join(list_of_values) + '\n'
+		if not isinstance(block, str):
+			return False
+		# digits around exactly one decimal point, an optional leading minus
+		if block.translate(None, '0123456789').replace('\n-.', '\n.') != '\n.' * len(list_of_values) + '\n':
+			return False
+		if block.count('-') != block.count('\n-') or '\n.' in block or '-.' in block or '.\n' in block:
+			return False
+		# no leading zeros, no trailing zeros except of '.0'
+		if block.count('\n0') + block.count('\n-0') != block.count('\n0.') + block.count('\n-0.'):
+			return False
+		if block.count('0\n') != block.count('.0\n'):
+			return False
+		# repr uses exponent notation below 1e-4
+		return '\n0.0000' not in block and '\n-0.0000' not in block
+
+	def _extend_string(self, list_of_values):
+		"""
+			Add values to a dictionary-encoded column
+
+			@param list_of_values: Cell values
+			@type list_of_values: list[str|unicode]
+
+			@return: Nothing
+			@rtype: None
+		"""
+		try:
+			new_values = set(list_of_values).difference(self._lookup)
+		except TypeError:
+			new_values = None
+		if new_values is None or not all(isinstance(value, basestring) for value in new_values):
+			self._set_type(self._type_object, list(self) + list_of_values)
+			return
+		size = len(self._pool) + len(new_values)
+		if size > self._minimum_pool_size and size > self._maximum_pool_ratio * (len(self._data) + len(list_of_values)):
+			self._set_type(self._type_packed, list(self) + list_of_values)
+			return
+		for value in new_values:
+			self._add_to_pool(value)
+		self._data.extend(map(self._lookup.__getitem__, list_of_values))
+
+	def _extend_packed(self, list_of_values):
+		"""
+			Add values to the buffer of a packed column
+
+			@attention: Each value is followed by a line break, the end offsets point behind it
+
+			@param list_of_values: Cell values
+			@type list_of_values: list[str|unicode]
+
+			@return: Nothing
+			@rtype: None
+		"""
+		try:
+			block = '\n'.join(list_of_values)
+		except TypeError:
+			block = None
+		# unicode values are not packed
+		if not isinstance(block, str):
+			self._set_type(self._type_object, list(self) + list_of_values)
+			return
+		if block.count('\n') != len(list_of_values) - 1:
+			self._has_line_breaks = True
+		offsets = []
+		offset = len(self._buffer)
+		for length in imap(len, list_of_values):
+			offset += length + 1
+			offsets.append(offset)
+		self._buffer.extend(block)
+		self._buffer.extend('\n')
+		self._data.extend(array.array(self._data.typecode, offsets))
+
+	def _get_packed(self, index):
+		"""
+			Get a value of a packed column
+
+			@param index: row index
+			@type index: int | long
+
+			@return: Cell value
+			@rtype: str
+
+			@raises: IndexError
+		"""
+		if index < 0:
+			index += len(self._data)
+			if index < 0:
+				raise IndexError("column index out of range")
+		end = self._data[index]
+		start = self._data[index - 1] if index > 0 else 0
+		return str(self._buffer[start:end - 1])
+
+	def _get_packed_range(self, start, stop):
+		"""
+			Get consecutive values of a packed column
+
+			@param start: index of first value
+			@type start: int | long
+			@param stop: index after last value
+			@type stop: int | long
+
+			@return: Cell values
+			@rtype: list[str]
+		"""
+		if start >= stop:
+			return []
+		offsets = self._data
+		first = offsets[start - 1] if start > 0 else 0
+		data = str(self._buffer[first:offsets[stop - 1]])
+		if not self._has_line_breaks:
+			return data[:-1].split('\n')
+		ends = offsets[start:stop]
+		return [data[begin - first:end - first - 1] for begin, end in izip(chain([first], ends), ends)]
+
+	def _iter_packed(self):
+		block_size = self._packed_block_size
+		for start in xrange(0, len(self._data), block_size):
+			for value in self._get_packed_range(start, min(start + block_size, len(self._data))):
+				yield value
+
+	def _find_packed(self, value):
+		"""
+			Get index of first occurrence of a value in a packed column
+
+			@param value: cell value
+			@type value: str | unicode
+
+			@return: index of value or None if value is not in the column
+			@rtype: int | None
+		"""
+		if not isinstance(value, str) or self._has_line_breaks or '\n' in value:
+			for index, cell_value in enumerate(self._iter_packed()):
+				if cell_value == value:
+					return index
+			return None
+		buffer = self._buffer
+		pattern = value + '\n'
+		position = buffer.find(pattern)
+		# a match must start right after the end of a value
+		while position > 0 and buffer[position - 1] != ord('\n'):
+			position = buffer.find(pattern, position + 1)
+		if position == -1:
+			return None
+		return bisect_right(self._data, position)
+
+	def _add_to_pool(self, value):
+		code = len(self._pool)
+		self._pool.append(value)
+		self._lookup[value] = code
+		return code
+
+	def _validate_pool_size(self):
+		"""
+			Drop the dictionary encoding if most values are unique
+
+			@return: Nothing
+			@rtype: None
+		"""
+		size = len(self._pool)
+		if size > self._minimum_pool_size and size > self._maximum_pool_ratio * len(self._data):
+			self._set_type(self._type_packed, list(self))
+
+	def _decode(self, data):
+		"""
+			Restore cell values from stored data
+
+			@param data: stored data
+			@type data: array.array | list
+
+			@return: Cell values
+			@rtype: list[str|unicode]
+		"""
+		if self._type == self._type_integer:
+			return map(str, data)
+		if self._type == self._type_float:
+			return map(repr, data)
+		if self._type == self._type_string:
+			pool = self._pool
+			return [pool[code] for code in data]
+		return list(data)
+
+	def __len__(self):
+		return len(self._data)
+
+	def __iter__(self):
+		if self._type == self._type_integer:
+			return imap(str, self._data)
+		if self._type == self._type_float:
+			return imap(repr, self._data)
+		if self._type == self._type_string:
+			return imap(self._pool.__getitem__, self._data)
+		if self._type == self._type_packed:
+			return self._iter_packed()
+		return iter(self._data)
+
+	def __getitem__(self, key):
+		if self._type == self._type_packed:
+			if isinstance(key, slice):
+				start, stop, step = key.indices(len(self._data))
+				if step == 1:
+					return self._get_packed_range(start, stop)
+				return [self._get_packed(index) for index in xrange(start, stop, step)]
+			return self._get_packed(key)
+		if isinstance(key, slice):
+			return self._decode(self._data[key])
+		if self._type == self._type_integer:
+			return str(self._data[key])
+		if self._type == self._type_float:
+			return repr(self._data[key])
+		if self._type == self._type_string:
+			return self._pool[self._data[key]]
+		return self._data[key]
+
+	def __contains__(self, value):
+		if self._type == self._type_string:
+			return value in self._lookup
+		return self._find(value) is not None
+
+	def _find(self, value):
+		"""
+			Get index of first occurrence of a cell value
+
+			@attention: Float cells are compared by their text, so '-0.0' does not match '0.0' and 'nan' matches 'nan'
+
+			@param value: cell value
+			@type value: str | unicode
+
+			@return: index of value or None if value is not in the column
+			@rtype: int | None
+		"""
+		if self._type == self._type_object:
+			try:
+				return self._data.index(value)
+			except ValueError:
+				return None
+		if self._type is None or not isinstance(value, basestring):
+			return None
+		if self._type == self._type_string:
+			code = self._lookup.get(value)
+			return None if code is None else self._data.index(code)
+		if self._type == self._type_packed:
+			return self._find_packed(value)
+		try:
+			if self._type == self._type_integer:
+				number = int(value)
+				is_exact = str(number) == value
+			else:
+				number = float(value)
+				is_exact = repr(number) == value
+		except (ValueError, OverflowError):
+			return None
+		if not is_exact:
+			return None
+		if self._type == self._type_float and (number != number or number == 0):
+			# nan does not equal itself and -0.0 equals 0.0
+			for index, cell_value in enumerate(imap(repr, self._data)):
+				if cell_value == value:
+					return index
+			return None
+		try:
+			return self._data.index(number)
+		except ValueError:
+			return None
+
+	def index(self, value):
+		"""
+			Get index of first occurrence of a value
+
+			@param value: cell value
+			@type value: str | unicode
+
+			@return: index of value
+			@rtype: int
+
+			@raises: ValueError
+		"""
+		index = self._find(value)
+		if index is None:
+			raise ValueError("'{}' is not in column".format(value))
+		return index
+
+	def take(self, list_of_indexes):
+		"""
+			Get a new column of the values at a list of row indexes
+
+			@param list_of_indexes: row indexes
+			@type list_of_indexes: list[int|long]
+
+			@return: new column
+			@rtype: Column
+		"""
+		column = Column()
+		data = self._data
+		if self._type in (self._type_integer, self._type_float):
+			column._type = self._type
+			column._data = array.array(self._typecode[self._type], [data[index] for index in list_of_indexes])
+		elif self._type == self._type_string:
+			column._set_type(self._type_string)
+			pool = self._pool
+			new_pool = column._pool
+			new_lookup = column._lookup
+			new_codes = {}
+			codes = []
+			for index in list_of_indexes:
+				code = data[index]
+				new_code = new_codes.get(code)
+				if new_code is None:
+					new_code = len(new_pool)
+					new_codes[code] = new_code
+					new_pool.append(pool[code])
+					new_lookup[pool[code]] = new_code
+				codes.append(new_code)
+			column._data.extend(codes)
+		elif self._type == self._type_packed:
+			column._set_type(self._type_packed, [self._get_packed(index) for index in list_of_indexes])
+		elif self._type == self._type_object:
+			column._set_type(self._type_object, [data[index] for index in list_of_indexes])
+		return column
+
+	def to_buffers(self):
+		"""
+			Get the stored data in a dictionary-encoded binary form
+
+			@attention: Only columns of str values can be encoded.
+			Packed columns return their end offsets as binary data and their buffer instead of a pool.
+
+			@return: column type, binary data, pool of distinct values, packed values or None for number columns
+			@rtype: tuple[str|None, str, list[str]|str|None]
+
+			@raises: TypeError
+		"""
+		if self._type in (None, self._type_integer, self._type_float):
+			return self._type, self._data.tostring() if self._type else '', None
+		if self._type == self._type_packed:
+			return self._type, self._data.tostring(), str(self._buffer)
+		if self._type == self._type_string:
+			pool = self._pool
+			data = self._data
+		else:
+			pool = []
+			lookup = {}
+			data = array.array(self._typecode[self._type_string])
+			for value in self._data:
+				code = lookup.get(value)
+				if code is None:
+					code = len(pool)
+					pool.append(value)
+					lookup[value] = code
+				data.append(code)
+		if not all(isinstance(value, str) for value in pool):
+			raise TypeError("Only str values can be encoded")
+		return self._type, data.tostring(), pool
+
+	def extend_buffers(self, column_type, data, pool=None):
+		"""
+			Add the values of a column in its dictionary-encoded binary form at the end of the column
+
+			@attention: Buffers of the same type are appended without decoding the values
+
+			@param column_type: 'int', 'float', 'str', 'packed', 'object' or None if empty
+			@type column_type: str | None
+			@param data: binary data
+			@type data: str | buffer
+			@param pool: distinct values or packed values
+			@type pool: list[str] | str | None
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if column_type is None:
+			return
+		if self._type is None and column_type != self._type_object:
+			self._set_type(column_type)
+		if column_type != self._type:
+			self.extend(list(Column.from_buffers(column_type, data, pool)))
+			return
+		if column_type == self._type_object:
+			self._data.extend(Column.from_buffers(column_type, data, pool)._data)
+			return
+		codes = array.array(self._data.typecode)
+		codes.fromstring(data)
+		if column_type == self._type_packed:
+			offset = len(self._buffer)
+			if offset > 0:
+				codes = array.array(codes.typecode, [end + offset for end in codes])
+			self._buffer.extend(pool)
+			self._data.extend(codes)
+			self._has_line_breaks = self._has_line_breaks or pool.count('\n') != len(codes)
+			return
+		if column_type != self._type_string:
+			self._data.extend(codes)
+			return
+		lookup = self._lookup
+		new_codes = [lookup[value] if value in lookup else self._add_to_pool(value) for value in pool]
+		self._data.extend(array.array(self._data.typecode, map(new_codes.__getitem__, codes)))
+		self._validate_pool_size()
+
+	@staticmethod
+	def from_buffers(column_type, data, pool=None):
+		"""
+			Restore a column from its dictionary-encoded binary form
+
+			@param column_type: 'int', 'float', 'str', 'packed', 'object' or None if empty
+			@type column_type: str | None
+			@param data: binary data
+			@type data: str | buffer
+			@param pool: distinct values or packed values
+			@type pool: list[str] | str | None
+
+			@return: column
+			@rtype: Column
+		"""
+		column = Column()
+		if column_type is None:
+			return column
+		if column_type == Column._type_object:
+			codes = array.array(Column._typecode[Column._type_string])
+			codes.fromstring(data)
+			column._set_type(column_type, map(pool.__getitem__, codes))
+			return column
+		column._set_type(column_type)
+		column._data.fromstring(data)
+		if column_type == Column._type_packed:
+			column._buffer = bytearray(pool)
+			column._has_line_breaks = pool.count('\n') != len(column._data)
+		elif column_type == Column._type_string:
+			column._pool = pool
+			column._lookup = dict(zip(pool, xrange(len(pool))))
+		return column
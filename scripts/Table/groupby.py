@@ -0,0 +1,266 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+from itertools import izip
+from scripts.Table.column import to_number
+
+
+def _to_string(number):
+	if number is None:
+		return ''
+	if isinstance(number, float):
+		return repr(number)
+	return str(number)
+
+
+class _Aggregation(object):
+	"""Per-group state of an aggregation function"""
+
+	_default = None
+
+	def __init__(self):
+		self._states = []
+
+	def extend(self, number_of_groups):
+		"""
+			Add states for new groups
+
+			@param number_of_groups: total number of groups
+			@type number_of_groups: int
+
+			@return: Nothing
+			@rtype: None
+		"""
+		missing = number_of_groups - len(self._states)
+		if missing > 0:
+			self._states.extend([self._default] * missing)
+
+	def get_values(self):
+		return [_to_string(state) for state in self._states]
+
+
+class _Count(_Aggregation):
+	_default = 0
+
+	def update(self, list_of_group_ids, list_of_values):
+		states = self._states
+		for group_id in list_of_group_ids:
+			states[group_id] += 1
+
+
+class _Sum(_Aggregation):
+	_default = 0
+
+	def update(self, list_of_group_ids, list_of_values):
+		states = self._states
+		for group_id, value in izip(list_of_group_ids, list_of_values):
+			if value != '':
+				states[group_id] += to_number(value)
+
+
+class _Min(_Aggregation):
+
+	def update(self, list_of_group_ids, list_of_values):
+		states = self._states
+		for group_id, value in izip(list_of_group_ids, list_of_values):
+			if value == '':
+				continue
+			number = to_number(value)
+			if states[group_id] is None or number < states[group_id]:
+				states[group_id] = number
+
+
+class _Max(_Aggregation):
+
+	def update(self, list_of_group_ids, list_of_values):
+		states = self._states
+		for group_id, value in izip(list_of_group_ids, list_of_values):
+			if value == '':
+				continue
+			number = to_number(value)
+			if states[group_id] is None or number > states[group_id]:
+				states[group_id] = number
+
+
+class _Mean(_Aggregation):
+
+	def __init__(self):
+		super(_Mean, self).__init__()
+		self._sum = _Sum()
+		self._count = _Count()
+
+	def extend(self, number_of_groups):
+		self._sum.extend(number_of_groups)
+		self._count.extend(number_of_groups)
+
+	def update(self, list_of_group_ids, list_of_values):
+		self._sum.update(list_of_group_ids, list_of_values)
+		self._count.update(
+			[group_id for group_id, value in izip(list_of_group_ids, list_of_values) if value != ''], list_of_values)
+
+	def get_values(self):
+		return [
+			repr(float(total) / count) if count > 0 else ''
+			for total, count in izip(self._sum._states, self._count._states)]
+
+
+class _Distinct(_Aggregation):
+
+	def extend(self, number_of_groups):
+		while len(self._states) < number_of_groups:
+			self._states.append(set())
+
+	def update(self, list_of_group_ids, list_of_values):
+		states = self._states
+		for group_id, value in izip(list_of_group_ids, list_of_values):
+			states[group_id].add(value)
+
+	def get_values(self):
+		return [str(len(state)) for state in self._states]
+
+
+class _First(_Aggregation):
+
+	def update(self, list_of_group_ids, list_of_values):
+		states = self._states
+		for group_id, value in izip(list_of_group_ids, list_of_values):
+			if states[group_id] is None:
+				states[group_id] = value
+
+	def get_values(self):
+		return list(self._states)
+
+
+class _Last(_First):
+
+	def update(self, list_of_group_ids, list_of_values):
+		states = self._states
+		for group_id, value in izip(list_of_group_ids, list_of_values):
+			states[group_id] = value
+
+
+class GroupBy(object):
+	"""Hash aggregation of table columns by key columns"""
+
+	_aggregations = {
+		"count": _Count,
+		"sum": _Sum,
+		"min": _Min,
+		"max": _Max,
+		"mean": _Mean,
+		"distinct": _Distinct,
+		"first": _First,
+		"last": _Last,
+		}
+
+	def __init__(self, list_of_key_column_names, get_blocks, new_table, validate_column_names, logger):
+		"""
+			Group rows by the values of key columns
+
+			@attention: Groups are in order of their first row
+
+			@param list_of_key_column_names: names of key columns
+			@type list_of_key_column_names: list[int|long|str|unicode]
+			@param get_blocks: returns an iterator over blocks of rows, each a dict of column name to cell values
+			@type get_blocks: () -> iterator[dict[int|long|str|unicode, list[str|unicode]]]
+			@param new_table: returns a table of column names and columns
+			@type new_table: (list[int|long|str|unicode], list[list[str|unicode]]) -> MetadataTable
+			@param validate_column_names: returns True if all columns of a list exist
+			@type validate_column_names: (list[int|long|str|unicode]) -> bool
+			@param logger: logger of the table
+			@type logger: LoggingWrapper
+
+			@return: None
+			@rtype: None
+		"""
+		self._list_of_key_column_names = list_of_key_column_names
+		self._get_blocks = get_blocks
+		self._new_table = new_table
+		self._validate_column_names = validate_column_names
+		self._logger = logger
+
+	def agg(self, list_of_aggregations):
+		"""
+			Aggregate values of columns per group in one pass
+
+			@attention: Available functions: count, sum, min, max, mean, distinct, first, last.
+			sum, min, max and mean require numbers and skip empty cells, they are empty for groups without numbers.
+
+			@param list_of_aggregations: tuples of column name, function name and optional name of the result column
+			@type list_of_aggregations: list[tuple]
+
+			@return: Table of key columns and one column per aggregation
+			@rtype: MetadataTable
+
+			@raises: ValueError
+		"""
+		assert isinstance(list_of_aggregations, list)
+		list_of_column_names = list(self._list_of_key_column_names)
+		list_of_functions = []
+		for aggregation in list_of_aggregations:
+			assert isinstance(aggregation, tuple) and len(aggregation) in (2, 3), "Bad aggregation: {}".format(aggregation)
+			column_name, function_name = aggregation[:2]
+			assert function_name in self._aggregations, "Unknown aggregation: '{}'".format(function_name)
+			if len(aggregation) == 3:
+				result_column_name = aggregation[2]
+			elif isinstance(column_name, basestring):
+				result_column_name = "{}_{}".format(column_name, function_name)
+			else:
+				result_column_name = len(list_of_column_names)
+			assert result_column_name not in list_of_column_names, "Column names must be unique!"
+			list_of_column_names.append(result_column_name)
+			list_of_functions.append((column_name, self._aggregations[function_name]()))
+		list_of_value_column_names = [column_name for column_name, _ in list_of_functions]
+		if not self._validate_column_names(list_of_value_column_names):
+			msg = "Columns not found: {}".format(list_of_value_column_names)
+			self._logger.error(msg)
+			raise ValueError(msg)
+
+		groups = {}
+		number_of_rows = 0
+		for block in self._get_blocks():
+			if len(self._list_of_key_column_names) == 1:
+				keys = block[self._list_of_key_column_names[0]]
+			else:
+				keys = izip(*[block[column_name] for column_name in self._list_of_key_column_names])
+			list_of_group_ids = [groups.setdefault(key, len(groups)) for key in keys]
+			for column_name, function in list_of_functions:
+				function.extend(len(groups))
+				try:
+					function.update(list_of_group_ids, block[column_name])
+				except ValueError:
+					row, value = self._get_bad_number(block[column_name])
+					msg = "Not a number in column '{}', row {}: '{}'".format(column_name, number_of_rows + row, value)
+					self._logger.error(msg)
+					raise ValueError(msg)
+			number_of_rows += len(list_of_group_ids)
+
+		list_of_keys = [None] * len(groups)
+		for key, group_id in groups.iteritems():
+			list_of_keys[group_id] = key
+		if len(self._list_of_key_column_names) == 1:
+			list_of_columns = [list_of_keys]
+		else:
+			list_of_columns = [list(values) for values in zip(*list_of_keys)] or [[] for _ in self._list_of_key_column_names]
+		for column_name, function in list_of_functions:
+			list_of_columns.append(function.get_values())
+		return self._new_table(list_of_column_names, list_of_columns)
+
+	@staticmethod
+	def _get_bad_number(list_of_values):
+		"""
+			Find the first cell that is neither empty nor a number
+
+			@param list_of_values: cell values
+			@type list_of_values: list[str|unicode]
+
+			@return: row index and value of the cell
+			@rtype: tuple[int, str|unicode]
+		"""
+		for row, value in enumerate(list_of_values):
+			if value == '':
+				continue
+			try:
+				to_number(value)
+			except ValueError:
+				return row, value
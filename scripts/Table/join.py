@@ -0,0 +1,155 @@
+"""
+	Row matching of two tables by key values.
+	Both functions return the matched row indexes of the left and right table, None where a row has no partner.
+"""
+
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+
+def hash_join(list_of_left_keys, list_of_right_keys, how="inner"):
+	"""
+		Match rows by building a hash table of the keys of the smaller table
+
+		@attention: Rows are in order of the left table, unmatched right rows of an outer join are appended
+
+		@param list_of_left_keys: key of each row of the left table
+		@type list_of_left_keys: collections.Sequence[str|tuple]
+		@param list_of_right_keys: key of each row of the right table
+		@type list_of_right_keys: collections.Sequence[str|tuple]
+		@param how: 'inner', 'left' or 'outer'
+		@type how: str | unicode
+
+		@return: left row indexes, right row indexes
+		@rtype: tuple[list[int|None], list[int|None]]
+	"""
+	keep_left = how in ("left", "outer")
+	left_indexes = []
+	right_indexes = []
+	if len(list_of_right_keys) <= len(list_of_left_keys):
+		right_map = {}
+		for right_index, key in enumerate(list_of_right_keys):
+			right_map.setdefault(key, []).append(right_index)
+		matched_keys = set()
+		for left_index, key in enumerate(list_of_left_keys):
+			matches = right_map.get(key)
+			if matches is None:
+				if keep_left:
+					left_indexes.append(left_index)
+					right_indexes.append(None)
+				continue
+			matched_keys.add(key)
+			left_indexes.extend([left_index] * len(matches))
+			right_indexes.extend(matches)
+		if how == "outer":
+			for right_index, key in enumerate(list_of_right_keys):
+				if key not in matched_keys:
+					left_indexes.append(None)
+					right_indexes.append(right_index)
+		return left_indexes, right_indexes
+
+	left_map = {}
+	for left_index, key in enumerate(list_of_left_keys):
+		left_map.setdefault(key, []).append(left_index)
+	matches_of_left = {}
+	unmatched_right = []
+	for right_index, key in enumerate(list_of_right_keys):
+		matches = left_map.get(key)
+		if matches is None:
+			unmatched_right.append(right_index)
+			continue
+		for left_index in matches:
+			matches_of_left.setdefault(left_index, []).append(right_index)
+	for left_index in xrange(len(list_of_left_keys)):
+		matches = matches_of_left.get(left_index)
+		if matches is None:
+			if keep_left:
+				left_indexes.append(left_index)
+				right_indexes.append(None)
+			continue
+		left_indexes.extend([left_index] * len(matches))
+		right_indexes.extend(matches)
+	if how == "outer":
+		left_indexes.extend([None] * len(unmatched_right))
+		right_indexes.extend(unmatched_right)
+	return left_indexes, right_indexes
+
+
+def merge_join(iterable_of_left_keys, iterable_of_right_keys, how="inner"):
+	"""
+		Match rows of two tables sorted by key, without a hash table
+
+		@attention: Rows are in order of the keys. Keys are read once, one run of equal keys at a time.
+
+		@param iterable_of_left_keys: key of each row of the left table, in ascending order
+		@type iterable_of_left_keys: collections.Iterable[str|tuple]
+		@param iterable_of_right_keys: key of each row of the right table, in ascending order
+		@type iterable_of_right_keys: collections.Iterable[str|tuple]
+		@param how: 'inner', 'left' or 'outer'
+		@type how: str | unicode
+
+		@return: left row indexes, right row indexes
+		@rtype: tuple[list[int|None], list[int|None]]
+
+		@raises: ValueError
+	"""
+	keep_left = how in ("left", "outer")
+	keep_right = how == "outer"
+	left_indexes = []
+	right_indexes = []
+	left_runs = _iter_runs(iterable_of_left_keys)
+	right_runs = _iter_runs(iterable_of_right_keys)
+	left_run = next(left_runs, None)
+	right_run = next(right_runs, None)
+	while left_run is not None or right_run is not None:
+		if right_run is None or (left_run is not None and left_run[0] < right_run[0]):
+			_, left_index, left_end = left_run
+			if keep_left:
+				left_indexes.extend(xrange(left_index, left_end))
+				right_indexes.extend([None] * (left_end - left_index))
+			left_run = next(left_runs, None)
+		elif left_run is None or right_run[0] < left_run[0]:
+			_, right_index, right_end = right_run
+			if keep_right:
+				left_indexes.extend([None] * (right_end - right_index))
+				right_indexes.extend(xrange(right_index, right_end))
+			right_run = next(right_runs, None)
+		else:
+			_, left_index, left_end = left_run
+			_, right_index, right_end = right_run
+			for index in xrange(left_index, left_end):
+				left_indexes.extend([index] * (right_end - right_index))
+				right_indexes.extend(xrange(right_index, right_end))
+			left_run = next(left_runs, None)
+			right_run = next(right_runs, None)
+	return left_indexes, right_indexes
+
+
+def _iter_runs(iterable_of_keys):
+	"""
+		Iterate over runs of equal keys
+
+		@param iterable_of_keys: keys in ascending order
+		@type iterable_of_keys: collections.Iterable[str|tuple]
+
+		@return: key, index of first row and index after the last row of each run
+		@rtype: collections.Iterable[tuple[str|tuple, int, int]]
+
+		@raises: ValueError
+	"""
+	iterator = iter(iterable_of_keys)
+	for run_key in iterator:
+		break
+	else:
+		return
+	run_start = 0
+	index = 1
+	for key in iterator:
+		if key != run_key:
+			if key < run_key:
+				raise ValueError("Keys are not sorted: '{}' after '{}'".format(key, run_key))
+			yield run_key, run_start, index
+			run_key = key
+			run_start = index
+		index += 1
+	yield run_key, run_start, index
@@ -0,0 +1,344 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import re
+import mmap
+import array
+from bisect import bisect_right
+from scripts.Table.column import Column
+
+
+class RowOffsets(object):
+	"""Compact list of row offsets of a file, built per block of the file on first access"""
+
+	def __init__(self, get_row_starts):
+		"""
+			Offsets stored as 4 byte distances to the start of the block of the file they are in
+
+			@param get_row_starts: returns the ascending offsets of rows within a block for the start and end of the block
+			@type get_row_starts: (int|long, int|long) -> list[int]
+
+			@return: None
+			@rtype: None
+		"""
+		self._get_row_starts = get_row_starts
+		self._bases = array.array('L')
+		self._ends = array.array('L')
+		self._first_rows = array.array('L')
+		self._list_of_blocks = []
+		self._number_of_rows = 0
+
+	def add_block(self, start, end, number_of_rows, list_of_relative_offsets=None):
+		"""
+			Add a block of rows at the end
+
+			@param start: offset of the block in the file
+			@type start: int | long
+			@param end: offset of the end of the block
+			@type end: int | long
+			@param number_of_rows: number of rows in the block
+			@type number_of_rows: int
+			@param list_of_relative_offsets: ascending offsets of rows within the block, None to find them on access
+			@type list_of_relative_offsets: list[int] | None
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if number_of_rows == 0:
+			return
+		if list_of_relative_offsets is not None:
+			list_of_relative_offsets = array.array('I', list_of_relative_offsets)
+		self._bases.append(start)
+		self._ends.append(end)
+		self._first_rows.append(self._number_of_rows)
+		self._list_of_blocks.append(list_of_relative_offsets)
+		self._number_of_rows += number_of_rows
+
+	def __len__(self):
+		return self._number_of_rows
+
+	def __getitem__(self, index):
+		if index < 0:
+			index += self._number_of_rows
+		if not 0 <= index < self._number_of_rows:
+			raise IndexError("row index out of range")
+		block_index = bisect_right(self._first_rows, index) - 1
+		relative_offsets = self._list_of_blocks[block_index]
+		if relative_offsets is None:
+			relative_offsets = array.array('I', self._get_row_starts(self._bases[block_index], self._ends[block_index]))
+			self._list_of_blocks[block_index] = relative_offsets
+		return self._bases[block_index] + relative_offsets[index - self._first_rows[block_index]]
+
+	def __iter__(self):
+		for index in xrange(self._number_of_rows):
+			yield self[index]
+
+
+class MappedTable(object):
+	"""Row access to a memory-mapped separated values file"""
+
+	# number of bytes searched for row starts at once
+	_stride = 16 * 1024 * 1024
+
+	def __init__(self, file_path, separator="\t", column_names=False, comment_line=None):
+		"""
+			Memory-map an uncompressed file and index the start of each row
+
+			@attention: Only the row offsets are read, cells are parsed on access.
+			Opening still reads the whole file once, counting the lines of 16 MB blocks at a time in C.
+			Row offsets of blocks without comment or empty lines are found when a row of the block is first accessed,
+			and take 4 bytes per row from then on.
+
+			@param file_path: path to file
+			@type file_path: str | unicode
+			@param separator: character separating values in a row
+			@type separator: str | unicode
+			@param column_names: True if column names available
+			@type column_names: bool
+			@param comment_line: list of character indicating comment lines
+			@type comment_line: list[str|unicode]
+
+			@return: None
+			@rtype: None
+		"""
+		if comment_line is None:
+			comment_line = ['#']
+		self._separator = separator
+		self._mmap = None
+		self._data_start = 0
+		self._last_row_index = None
+		self._last_row = None
+		self.list_of_column_names = []
+		self.offsets = RowOffsets(self._get_row_starts)
+
+		with open(file_path, 'rb') as file_handler:
+			file_handler.seek(0, 2)
+			if file_handler.tell() == 0:
+				return
+			self._mmap = mmap.mmap(file_handler.fileno(), 0, access=mmap.ACCESS_READ)
+
+		if column_names:
+			row = self._mmap.readline().rstrip('\n').rstrip('\r')
+			self.list_of_column_names = row.split(separator)
+		self._data_start = self._mmap.tell()
+		self._index_rows(set(comment_line))
+
+	def _index_rows(self, comment_characters):
+		"""
+			Count the rows of each block of the file, skipping comment and empty lines
+
+			@param comment_characters: characters indicating comment lines
+			@type comment_characters: set[str|unicode]
+
+			@return: Nothing
+			@rtype: None
+		"""
+		# searched in one pass, instead of once per character
+		line_start = re.compile('\n[{}]'.format(re.escape(''.join(comment_characters) + '\r\n')))
+		data = self._mmap
+		size = data.size()
+		if data[size - 1] == '\n':
+			size -= 1
+		position = self._data_start
+		while position < size:
+			stop = min(position + self._stride, size)
+			end = size if stop == size else data.rfind('\n', position, stop)
+			if end == -1:
+				# a line longer than the stride
+				end = data.find('\n', stop)
+				if end == -1:
+					end = size
+			block = data[position:end]
+			if self._is_clean(block, comment_characters, line_start):
+				# every line is a row, offsets are found when a row of the block is accessed
+				self.offsets.add_block(position, end, block.count('\n') + 1)
+			else:
+				starts = []
+				start = 0
+				for line in block.split('\n'):
+					if line and line[0] not in comment_characters and line.rstrip('\r'):
+						starts.append(start)
+					start += len(line) + 1
+				self.offsets.add_block(position, end, len(starts), starts)
+			position = end + 1
+
+		if not self.list_of_column_names and len(self.offsets) > 0:
+			self.list_of_column_names = range(len(self.get_row(0)))
+
+	def _get_row_starts(self, start, end):
+		"""
+			Get the offsets of lines within a block without comment or empty lines
+
+			@param start: offset of the block in the file
+			@type start: int | long
+			@param end: offset of the end of the block
+			@type end: int | long
+
+			@return: ascending offsets of rows within the block
+			@rtype: list[int]
+		"""
+		block = self._mmap[start:end]
+		starts = []
+		append = starts.append
+		find = block.find
+		position = 0
+		while position != -1:
+			append(position)
+			position = find('\n', position) + 1 or -1
+		return starts
+
+	@staticmethod
+	def _is_clean(block, comment_characters, line_start):
+		"""
+			Test if a block of lines has no comment lines or empty lines
+
+			@attention: Lines starting with a carriage return are treated like empty lines
+
+			@param block: lines joined by line breaks
+			@type block: str
+			@param comment_characters: characters indicating comment lines
+			@type comment_characters: set[str|unicode]
+			@param line_start: matches a line break followed by a comment character, a carriage return or line break
+			@type line_start: _sre.SRE_Pattern
+
+			@return: True if every line is a row
+			@rtype: bool
+		"""
+		if not block or block[0] in '\r\n' or block[0] in comment_characters or block[-1] == '\n':
+			return False
+		return line_start.search(block) is None
+
+	def get_line_number(self, row_index):
+		"""
+			Get line number of a row, counting lines after the column names
+
+			@param row_index: index of row
+			@type row_index: int | long
+
+			@return: line number
+			@rtype: int
+		"""
+		return self._mmap[self._data_start:self.offsets[row_index]].count('\n') + 1
+
+	def get_row(self, row_index):
+		"""
+			Get the cell values of a row
+
+			@param row_index: index of row
+			@type row_index: int | long
+
+			@return: Cell values
+			@rtype: list[str|unicode]
+
+			@raises: ValueError
+		"""
+		if row_index < 0:
+			row_index += len(self.offsets)
+		if row_index == self._last_row_index:
+			return self._last_row
+		start = self.offsets[row_index]
+		end = self._mmap.find('\n', start)
+		if end == -1:
+			end = self._mmap.size()
+		row = self._mmap[start:end].rstrip('\r').split(self._separator)
+		if self.list_of_column_names and len(row) != len(self.list_of_column_names):
+			raise ValueError("Format error. Bad number of values in line {}".format(self.get_line_number(row_index)))
+		self._last_row_index = row_index
+		self._last_row = row
+		return row
+
+	def iter_rows(self):
+		"""
+			Iterate over the cell values of all rows
+
+			@return: Generator of rows
+			@rtype: generator[list[str|unicode]]
+		"""
+		for row_index in xrange(len(self.offsets)):
+			yield self.get_row(row_index)
+
+	def close(self):
+		if self._mmap is not None:
+			self._mmap.close()
+			self._mmap = None
+
+
+class LazyColumn(object):
+	"""Column of a memory-mapped file, parsed on access"""
+
+	def __init__(self, mapped_table, column_index):
+		"""
+			Column parsing its values from a mapped file on access
+
+			@attention: Any modification loads the whole column into memory
+
+			@param mapped_table: mapped file
+			@type mapped_table: MappedTable
+			@param column_index: index of column in a row
+			@type column_index: int
+
+			@return: None
+			@rtype: None
+		"""
+		self._mapped_table = mapped_table
+		self._column_index = column_index
+		self._column = None
+
+	def _load(self):
+		"""
+			Parse all values into memory
+
+			@return: Loaded column
+			@rtype: Column
+		"""
+		if self._column is None:
+			self._column = Column(list(self))
+		return self._column
+
+	def get_type(self):
+		return self._load().get_type()
+
+	def has_strings(self):
+		return self._column is None or self._column.has_strings()
+
+	def append(self, value):
+		self._load().append(value)
+
+	def extend(self, list_of_values):
+		self._load().extend(list_of_values)
+
+	def take(self, list_of_indexes):
+		if self._column is not None:
+			return self._column.take(list_of_indexes)
+		return Column([self[index] for index in list_of_indexes])
+
+	def index(self, value):
+		if self._column is not None:
+			return self._column.index(value)
+		for index, cell_value in enumerate(self):
+			if cell_value == value:
+				return index
+		raise ValueError("'{}' is not in column".format(value))
+
+	def __contains__(self, value):
+		if self._column is not None:
+			return value in self._column
+		return any(cell_value == value for cell_value in self)
+
+	def __len__(self):
+		if self._column is not None:
+			return len(self._column)
+		return len(self._mapped_table.offsets)
+
+	def __iter__(self):
+		if self._column is not None:
+			return iter(self._column)
+		column_index = self._column_index
+		return (row[column_index] for row in self._mapped_table.iter_rows())
+
+	def __getitem__(self, key):
+		if self._column is not None:
+			return self._column[key]
+		if isinstance(key, slice):
+			return [self[index] for index in xrange(*key.indices(len(self)))]
+		return self._mapped_table.get_row(key)[self._column_index]
@@ -0,0 +1,71 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import heapq
+from scripts.Table.column import to_number
+
+
+class ReversedKey(object):
+	"""Sort key with inverted order"""
+
+	__slots__ = ["key"]
+
+	def __init__(self, key):
+		self.key = key
+
+	def __lt__(self, other):
+		return other.key < self.key
+
+	def __eq__(self, other):
+		return self.key == other.key
+
+
+def get_key_function(list_of_positions, numeric=False, reverse=False):
+	"""
+		Get a function returning the sort key of a row
+
+		@param list_of_positions: positions of key cells in a row
+		@type list_of_positions: list[int]
+		@param numeric: If true, key cells are compared as numbers
+		@type numeric: bool
+		@param reverse: If true, the key sorts in descending order
+		@type reverse: bool
+
+		@return: function returning the key of a row
+		@rtype: (list[str|unicode]) -> object
+	"""
+	convert = to_number if numeric else None
+
+	def get_key(row):
+		if len(list_of_positions) == 1:
+			key = row[list_of_positions[0]]
+			if convert is not None:
+				key = convert(key)
+		elif convert is not None:
+			key = tuple([convert(row[position]) for position in list_of_positions])
+		else:
+			key = tuple([row[position] for position in list_of_positions])
+		if reverse:
+			return ReversedKey(key)
+		return key
+	return get_key
+
+
+def merge_runs(list_of_runs, get_key):
+	"""
+		Merge sorted runs of rows, keeping the order of runs for equal keys
+
+		@param list_of_runs: iterators over sorted rows
+		@type list_of_runs: list[iterator[list[str|unicode]]]
+		@param get_key: returns the sort key of a row
+		@type get_key: (list[str|unicode]) -> object
+
+		@return: Generator of rows in sorted order
+		@rtype: generator[list[str|unicode]]
+	"""
+	def decorate(run_index, run):
+		for row_index, row in enumerate(run):
+			yield get_key(row), run_index, row_index, row
+
+	for key, run_index, row_index, row in heapq.merge(*[decorate(index, run) for index, run in enumerate(list_of_runs)]):
+		yield row
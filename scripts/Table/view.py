@@ -0,0 +1,123 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+from itertools import izip
+
+
+class ColumnView(object):
+	"""Read-only view of a column without copying its values"""
+
+	def __init__(self, sequence, start=0, stop=None, step=1):
+		"""
+			Read-only view of a column or a range of it
+
+			@attention: A view reflects later changes of the viewed column, use copy() to get a modifiable list
+
+			@param sequence: Viewed column
+			@type sequence: list | scripts.Table.column.Column | scripts.Table.lazy.LazyColumn
+			@param start: first index of the view
+			@type start: int
+			@param stop: index after the last index of the view, None for the end of the column
+			@type stop: int | None
+			@param step: step between indexes of the view
+			@type step: int
+
+			@return: None
+			@rtype: None
+		"""
+		self._sequence = sequence
+		self._start = start
+		self._stop = stop
+		self._step = step
+
+	def _is_whole(self):
+		return self._start == 0 and self._stop is None and self._step == 1
+
+	def _get_range(self):
+		"""
+			Get indexes of the viewed column
+
+			@return: indexes
+			@rtype: xrange
+		"""
+		stop = len(self._sequence)
+		if self._stop is not None:
+			if self._step > 0:
+				stop = min(self._stop, stop)
+			else:
+				stop = self._stop
+		return xrange(self._start, stop, self._step)
+
+	def copy(self):
+		"""
+			Get the values as a new list
+
+			@return: Cell values
+			@rtype: list
+		"""
+		if self._is_whole():
+			return list(self._sequence)
+		if self._step == 1:
+			return list(self._sequence[self._start:self._stop])
+		return [self._sequence[index] for index in self._get_range()]
+
+	def __len__(self):
+		if self._is_whole():
+			return len(self._sequence)
+		return len(self._get_range())
+
+	def __iter__(self):
+		if self._is_whole():
+			return iter(self._sequence)
+		sequence = self._sequence
+		return (sequence[index] for index in self._get_range())
+
+	def __getitem__(self, key):
+		indexes = self._get_range()
+		if isinstance(key, slice):
+			start, stop, step = key.indices(len(indexes))
+			count = len(xrange(start, stop, step))
+			if count == 0:
+				return ColumnView([])
+			first = indexes[start]
+			step *= self._step
+			return ColumnView(self._sequence, first, first + count * step, step)
+		return self._sequence[indexes[key]]
+
+	def __contains__(self, value):
+		if self._is_whole():
+			return value in self._sequence
+		return any(cell_value == value for cell_value in self)
+
+	def index(self, value):
+		"""
+			Get index of first occurrence of a value
+
+			@param value: cell value
+			@type value: object
+
+			@return: index of value
+			@rtype: int
+
+			@raises: ValueError
+		"""
+		if self._is_whole():
+			return self._sequence.index(value)
+		for index, cell_value in enumerate(self):
+			if cell_value == value:
+				return index
+		raise ValueError("'{}' is not in column".format(value))
+
+	def __eq__(self, other):
+		if isinstance(other, (ColumnView, list, tuple)):
+			return len(self) == len(other) and all(a == b for a, b in izip(self, other))
+		return NotImplemented
+
+	def __ne__(self, other):
+		result = self.__eq__(other)
+		if result is NotImplemented:
+			return result
+		return not result
+
+	def __repr__(self):
+		return "ColumnView({})".format(self.copy())
@@ -0,0 +1,83 @@
+__author__ = 'hofmann'
+__version__ = '0.0.1'
+
+import sys
+import threading
+import Queue
+
+
+class ThreadedWriter(object):
+	"""Write to a file handler in a separate thread"""
+
+	def __init__(self, file_handler, max_queue_size=4):
+		"""
+			Pass written data through a bounded queue to a thread writing to a file handler
+
+			@attention: Lets formatting and compression overlap. The file handler is closed with the writer.
+
+			@param file_handler: file handler data is written to
+			@type file_handler: file | gzip.GzipFile | bz2.BZ2File
+			@param max_queue_size: maximum number of pending writes
+			@type max_queue_size: int
+
+			@return: None
+			@rtype: None
+		"""
+		self._file_handler = file_handler
+		self._queue = Queue.Queue(maxsize=max_queue_size)
+		self._exception_info = None
+		self._thread = threading.Thread(target=self._run)
+		self._thread.daemon = True
+		self._thread.start()
+
+	def _run(self):
+		while True:
+			data = self._queue.get()
+			if data is None:
+				break
+			if self._exception_info is not None:
+				continue
+			try:
+				self._file_handler.write(data)
+			except Exception:
+				self._exception_info = sys.exc_info()
+
+	def _raise_exception(self):
+		if self._exception_info is not None:
+			exception_type, exception, traceback = self._exception_info
+			self._exception_info = None
+			raise exception_type, exception, traceback
+
+	def write(self, data):
+		"""
+			Queue data to be written
+
+			@param data: data
+			@type data: str
+
+			@return: Nothing
+			@rtype: None
+		"""
+		self._raise_exception()
+		self._queue.put(data)
+
+	def close(self):
+		"""
+			Wait for pending writes and close the file handler
+
+			@return: Nothing
+			@rtype: None
+		"""
+		if self._thread is None:
+			return
+		self._queue.put(None)
+		self._thread.join()
+		self._thread = None
+		self._file_handler.close()
+		self._raise_exception()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exception_type, value, traceback):
+		self.close()